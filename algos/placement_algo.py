@@ -5,7 +5,19 @@ import numpy as np
 from datetime import datetime
 import polars as pl
 import csv
-from collections import defaultdict
+import math
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+# Candidate positions for new items: "extreme_points" (corners of the placed
+# boxes, see ExtremePoints), "heightmap" (resting on the top surface, see
+# HeightMap) or "grid" (every 10 cm lattice point)
+PLACEMENT_MODE = os.environ.get("PLACEMENT_MODE", "extreme_points")
+# Containers whose placement state is kept in memory (least recently used evicted)
+PLACEMENT_STATE_CACHE_SIZE = int(os.environ.get("PLACEMENT_STATE_CACHE_SIZE", "64"))
+# Cargo arrangement position columns (see storage.positions)
+CARGO_POSITION_COLUMNS = ["start_x_cm", "start_y_cm", "start_z_cm", "end_x_cm", "end_y_cm", "end_z_cm"]
 
 @dataclass
 class OctreeNode:
@@ -52,7 +64,12 @@ def load_csv(filename):
     return _CSV_CACHE[filename]
 
 class SparseMatrix:
-    """Optimized Sparse 3D matrix implementation using spatial partitioning"""
+    """
+    Sparse 3D occupancy using spatial partitioning: every grid_size cell
+    holds the exact boxes that reach into it, and queries run a true
+    interval test against the boxes of the cells they touch, so boxes that
+    only share a cell (or a face) do not collide.
+    """
     def __init__(self, width_cm, depth_cm, height_cm, grid_size=10):
         self.width_cm = int(width_cm)
         self.depth_cm = int(depth_cm)
@@ -63,47 +80,77 @@ class SparseMatrix:
         self.occupied_cells = set()
         # Track item positions
         self.item_positions = {}
+        # Bumped by every occupy/clear so derived structures can tell they are stale
+        self.version = 0
 
     def _get_grid_cell(self, x, y, z):
         return (x // self.grid_size, y // self.grid_size, z // self.grid_size)
 
+    def _cell_range(self, start, end):
+        """Cell indexes reached along one axis by [start, end); a box ending on a cell border stays out of the next cell."""
+        first = int(start // self.grid_size)
+        return range(first, max(first, math.ceil(end / self.grid_size) - 1) + 1)
+
+    def _cells(self, x_start, y_start, z_start, x_end, y_end, z_end):
+        return [
+            (x, y, z)
+            for x in self._cell_range(x_start, x_end)
+            for y in self._cell_range(y_start, y_end)
+            for z in self._cell_range(z_start, z_end)
+        ]
+
     def is_occupied(self, x_start, y_start, z_start, x_end, y_end, z_end):
-        """Optimized occupancy check using grid-based spatial partitioning"""
-        # Get grid cells that this region spans
-        start_cell = self._get_grid_cell(x_start, y_start, z_start)
-        end_cell = self._get_grid_cell(x_end, y_end, z_end)
-        
-        # Check only the relevant grid cells
-        for x in range(start_cell[0], end_cell[0] + 1):
-            for y in range(start_cell[1], end_cell[1] + 1):
-                for z in range(start_cell[2], end_cell[2] + 1):
-                    if (x, y, z) in self.grid and self.grid[(x, y, z)]:
-                        return True
-        return False
+        """Whether the box overlaps any stored box (touching faces do not count)"""
+        return self.first_collision(x_start, y_start, z_start, x_end, y_end, z_end) is not None
+
+    def first_collision(self, x_start, y_start, z_start, x_end, y_end, z_end):
+        """A stored box overlapping the given one, or None"""
+        grid = self.grid
+        size = self.grid_size
+        x_first, y_first, z_first = int(x_start // size), int(y_start // size), int(z_start // size)
+        x_cells = range(x_first, max(x_first, math.ceil(x_end / size) - 1) + 1)
+        y_cells = range(y_first, max(y_first, math.ceil(y_end / size) - 1) + 1)
+        z_cells = range(z_first, max(z_first, math.ceil(z_end / size) - 1) + 1)
+        for x in x_cells:
+            for y in y_cells:
+                for z in z_cells:
+                    boxes = grid.get((x, y, z))
+                    if not boxes:
+                        continue
+                    # A box spanning several cells may be tested more than once; that is cheaper than tracking it
+                    for box in boxes:
+                        if (box[0] < x_end and x_start < box[3] and
+                                box[1] < y_end and y_start < box[4] and
+                                box[2] < z_end and z_start < box[5]):
+                            return box
+        return None
 
     def occupy(self, x_start, y_start, z_start, x_end, y_end, z_end):
         """Optimized occupation marking using grid-based spatial partitioning"""
-        start_cell = self._get_grid_cell(x_start, y_start, z_start)
-        end_cell = self._get_grid_cell(x_end, y_end, z_end)
-        
-        for x in range(start_cell[0], end_cell[0] + 1):
-            for y in range(start_cell[1], end_cell[1] + 1):
-                for z in range(start_cell[2], end_cell[2] + 1):
-                    self.grid[(x, y, z)].add((x_start, y_start, z_start, x_end, y_end, z_end))
-                    self.occupied_cells.add((x, y, z))
+        box = (x_start, y_start, z_start, x_end, y_end, z_end)
+        for cell in self._cells(*box):
+            self.grid[cell].add(box)
+            self.occupied_cells.add(cell)
+        self.version += 1
 
     def clear(self, x_start, y_start, z_start, x_end, y_end, z_end):
         """Clear a region from the grid"""
-        start_cell = self._get_grid_cell(x_start, y_start, z_start)
-        end_cell = self._get_grid_cell(x_end, y_end, z_end)
-        
-        for x in range(start_cell[0], end_cell[0] + 1):
-            for y in range(start_cell[1], end_cell[1] + 1):
-                for z in range(start_cell[2], end_cell[2] + 1):
-                    if (x, y, z) in self.grid:
-                        self.grid[(x, y, z)].discard((x_start, y_start, z_start, x_end, y_end, z_end))
-                        if not self.grid[(x, y, z)]:
-                            self.occupied_cells.discard((x, y, z))
+        box = (x_start, y_start, z_start, x_end, y_end, z_end)
+        for cell in self._cells(*box):
+            if cell in self.grid:
+                self.grid[cell].discard(box)
+                if not self.grid[cell]:
+                    self.occupied_cells.discard(cell)
+        self.version += 1
+
+    def copy(self) -> "SparseMatrix":
+        """Independent copy holding the same boxes"""
+        matrix = SparseMatrix(self.width_cm, self.depth_cm, self.height_cm, self.grid_size)
+        matrix.grid = defaultdict(set, {cell: set(boxes) for cell, boxes in self.grid.items() if boxes})
+        matrix.occupied_cells = set(self.occupied_cells)
+        matrix.item_positions = dict(self.item_positions)
+        matrix.version = self.version
+        return matrix
 
     def get_occupied_regions(self):
         """Get all occupied regions in the grid"""
@@ -112,6 +159,156 @@ class SparseMatrix:
             regions.update(self.grid[cell])
         return regions
 
+class ExtremePoints:
+    """
+    Candidate positions for the next box, generated from the boxes already
+    placed (extreme points, Crainic et al.): each placed box contributes the
+    points just past its far corner along x, y and z, each also projected
+    back onto the nearest box face or wall along the other two axes. The
+    candidate count grows with the number of boxes, not with the volume.
+
+    Fit tests are exact interval tests against every placed box, evaluated
+    for a chunk of candidates at a time with NumPy.
+    """
+
+    # Candidates tested per vectorized chunk
+    CHUNK = 256
+
+    def __init__(self, width_cm: int, depth_cm: int, height_cm: int):
+        self.dims = np.array([width_cm, depth_cm, height_cm])
+        self.starts = np.empty((0, 3), dtype=np.int32)
+        self.ends = np.empty((0, 3), dtype=np.int32)
+        self.points = {(0, 0, 0)}
+        # self.points as a sorted array, rebuilt after add
+        self._candidates: Optional[np.ndarray] = None
+        # Candidate positions examined by find, for comparing modes
+        self.probes = 0
+
+    @classmethod
+    def from_regions(cls, width_cm: int, depth_cm: int, height_cm: int, regions) -> "ExtremePoints":
+        """Extreme points of boxes given as (x0, y0, z0, x1, y1, z1) tuples, e.g. SparseMatrix regions."""
+        points = cls(width_cm, depth_cm, height_cm)
+        for region in sorted(regions):
+            points.add(region[:3], region[3:])
+        return points
+
+    def fits(self, start, size) -> bool:
+        """Whether a box of size at start lies in the container without overlapping a placed box."""
+        start, end = np.asarray(start), np.asarray(start) + np.asarray(size)
+        if (start < 0).any() or (end > self.dims).any():
+            return False
+        return not ((self.starts < end) & (self.ends > start)).all(axis=1).any()
+
+    def find(self, size) -> Optional[Tuple[int, int, int]]:
+        """First candidate in (x, y, z) order where a box of size fits, or None."""
+        size = np.asarray(size, dtype=np.int32)
+        if self._candidates is None:
+            # reshape keeps the (n, 3) shape once a full container has no points left
+            self._candidates = np.array(sorted(self.points), dtype=np.int32).reshape(-1, 3)
+        candidates = self._candidates[(self._candidates + size <= self.dims).all(axis=1)]
+        for offset in range(0, len(candidates), self.CHUNK):
+            chunk = candidates[offset:offset + self.CHUNK]
+            self.probes += len(chunk)
+            if len(self.starts):
+                # (candidates, boxes) overlap matrix built one axis at a time;
+                # a candidate fits when its row is all False
+                ends = chunk + size
+                overlap = (self.starts[:, 0] < ends[:, 0, None]) & (self.ends[:, 0] > chunk[:, 0, None])
+                for axis in (1, 2):
+                    overlap &= (self.starts[:, axis] < ends[:, axis, None]) & (self.ends[:, axis] > chunk[:, axis, None])
+                free = np.flatnonzero(~overlap.any(axis=1))
+                if not free.size:
+                    continue
+                chunk = chunk[free]
+            return tuple(int(value) for value in chunk[0])
+        return None
+
+    def _project(self, point: np.ndarray, axis: int) -> np.ndarray:
+        """Slide point towards 0 along axis until it meets a box face or the wall."""
+        others = [other for other in range(3) if other != axis]
+        below = self.ends[:, axis] <= point[axis]
+        for other in others:
+            below &= (self.starts[:, other] <= point[other]) & (self.ends[:, other] > point[other])
+        projected = point.copy()
+        projected[axis] = self.ends[below, axis].max() if below.any() else 0
+        return projected
+
+    def add(self, start, end) -> None:
+        """Record a placed box and update the candidate positions."""
+        start, end = np.asarray(start, dtype=np.int32), np.asarray(end, dtype=np.int32)
+        self.starts = np.vstack([self.starts, start])
+        self.ends = np.vstack([self.ends, end])
+        self._candidates = None
+        for axis in range(3):
+            point = start.copy()
+            point[axis] = end[axis]
+            if point[axis] >= self.dims[axis]:
+                continue
+            new_points = [point] + [self._project(point, other) for other in range(3) if other != axis]
+            self.points.update(tuple(int(value) for value in new) for new in new_points)
+        # Candidates now covered by the box can never fit again
+        self.points = {
+            point for point in self.points
+            if not all(start[axis] <= point[axis] < end[axis] for axis in range(3))
+        }
+
+class HeightMap:
+    """
+    2.5D skyline of a container loaded bottom-up: heights[x, y] is the top
+    of the highest box over the 1 cm column at (x, y). A box always rests on
+    the highest surface under its footprint, so space under overhangs is
+    never reused, but every footprint of an item is evaluated in one pass:
+    the resting heights are a sliding-window max over the map.
+    """
+
+    def __init__(self, width_cm: int, depth_cm: int, height_cm: int):
+        self.height_cm = height_cm
+        self.heights = np.zeros((width_cm, depth_cm), dtype=np.int32)
+        # Footprints evaluated by find, for comparing modes
+        self.probes = 0
+
+    @classmethod
+    def from_regions(cls, width_cm: int, depth_cm: int, height_cm: int, regions) -> "HeightMap":
+        """Height map of boxes given as (x0, y0, z0, x1, y1, z1) tuples, e.g. SparseMatrix regions."""
+        heights = cls(width_cm, depth_cm, height_cm)
+        for region in regions:
+            heights.add(region[:3], region[3:])
+        return heights
+
+    def resting_heights(self, width: int, depth: int) -> np.ndarray:
+        """Resting height of a width x depth footprint at every origin (x, y), by separable max pooling."""
+        rows = np.lib.stride_tricks.sliding_window_view(self.heights, width, axis=0).max(axis=-1)
+        return np.lib.stride_tricks.sliding_window_view(rows, depth, axis=1).max(axis=-1)
+
+    def fits(self, start, size) -> bool:
+        """Whether a box of size at start is in the container and at or above the surface under it."""
+        (x, y, z), (width, depth, height) = start, size
+        if x < 0 or y < 0 or x + width > self.heights.shape[0] or y + depth > self.heights.shape[1]:
+            return False
+        return z >= self.heights[x:x + width, y:y + depth].max() and z + height <= self.height_cm
+
+    def find(self, size) -> Optional[Tuple[int, int, int]]:
+        """Lowest resting position (then smallest x, y) where a box of size fits, or None."""
+        width, depth, height = size
+        if width > self.heights.shape[0] or depth > self.heights.shape[1] or width <= 0 or depth <= 0:
+            return None
+        resting = self.resting_heights(width, depth)
+        self.probes += resting.size
+        # Row-major argmin picks the smallest x, then y among the lowest footprints
+        best = int(np.argmin(resting))
+        x, y = divmod(best, resting.shape[1])
+        z = int(resting[x, y])
+        if z + height > self.height_cm:
+            return None
+        return x, y, z
+
+    def add(self, start, end) -> None:
+        """Raise the surface under a placed box to its top."""
+        x0, y0 = max(0, int(start[0])), max(0, int(start[1]))
+        x1, y1 = int(end[0]), int(end[1])
+        footprint = self.heights[x0:x1, y0:y1]
+        np.maximum(footprint, int(end[2]), out=footprint)
+
 class SpaceOctree:
     def __init__(self, center: np.ndarray, size: float, max_depth: int = 4):
         self.root = OctreeNode(center, size, [])
@@ -304,31 +501,117 @@ class SpaceOctree:
         
         return list(neighbors)
 
+class ContainerState:
+    """Placement state of one container: occupied space and the positions placed in it."""
+    def __init__(self, width_cm: int, depth_cm: int, height_cm: int, cargo_boxes: frozenset = frozenset()):
+        self.dims = (width_cm, depth_cm, height_cm)
+        self.space_matrix = SparseMatrix(width_cm, depth_cm, height_cm)
+        self.current_placements: Dict[str, Position3D] = {}
+        self.rearrangement_history = []
+        # Cargo arrangement boxes the state was loaded from, to notice when the arrangement changes
+        self.cargo_boxes = cargo_boxes
+
+    @classmethod
+    def from_cargo(cls, width_cm: int, depth_cm: int, height_cm: int, cargo_boxes: Dict[str, Tuple]) -> "ContainerState":
+        state = cls(width_cm, depth_cm, height_cm, frozenset(cargo_boxes.items()))
+        for item_id, box in cargo_boxes.items():
+            state.space_matrix.occupy(*box)
+            state.current_placements[item_id] = Position3D(*box[:3])
+        return state
+
+    def release(self, item_ids) -> None:
+        """Take items out of the container, e.g. ones about to be placed again."""
+        boxes = dict(self.cargo_boxes)
+        for item_id in item_ids:
+            box = boxes.get(str(item_id))
+            if box is not None and str(item_id) in self.current_placements:
+                self.space_matrix.clear(*box)
+                del self.current_placements[str(item_id)]
+
+    def copy(self) -> "ContainerState":
+        """A working copy for one placement run; the copy can be changed without touching this state."""
+        state = ContainerState(*self.dims, self.cargo_boxes)
+        state.space_matrix = self.space_matrix.copy()
+        state.current_placements = dict(self.current_placements)
+        state.rearrangement_history = list(self.rearrangement_history)
+        return state
+
+def cargo_boxes(cargo_rows: List[Dict]) -> Dict[str, Tuple]:
+    """Placed boxes by item id from cargo arrangement rows, rounded out to whole cm."""
+    boxes = {}
+    for row in cargo_rows:
+        values = [row.get(column) for column in CARGO_POSITION_COLUMNS]
+        if any(value is None for value in values):
+            continue
+        boxes[str(row["item_id"])] = (
+            tuple(int(math.floor(value)) for value in values[:3]) +
+            tuple(int(math.ceil(value)) for value in values[3:])
+        )
+    return boxes
+
+class PlacementStates:
+    """
+    ContainerState per container_id as loaded from its cargo arrangement,
+    at most capacity of them, least recently used evicted first. A state is
+    rebuilt when it is missing, was evicted, or the arrangement of its
+    container changed since it was built. Cached states are never changed:
+    placers work on copies, so a placement run (which is not written back
+    to the arrangement) does not leak into the next one.
+    """
+    def __init__(self, capacity: int = PLACEMENT_STATE_CACHE_SIZE):
+        self.capacity = capacity
+        self._states: "OrderedDict[str, ContainerState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, container_id: str, dims: Tuple[int, int, int], cargo_rows: Optional[List[Dict]] = None) -> ContainerState:
+        boxes = cargo_boxes(cargo_rows or [])
+        with self._lock:
+            state = self._states.get(container_id)
+            if state is None or state.dims != dims or state.cargo_boxes != frozenset(boxes.items()):
+                state = ContainerState.from_cargo(*dims, boxes)
+                self._states[container_id] = state
+            self._states.move_to_end(container_id)
+            while len(self._states) > self.capacity:
+                self._states.popitem(last=False)
+            return state
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
 class AdvancedCargoPlacement:
-    # Class-level storage for container states
-    _container_states = {}
+    # Container states loaded from the cargo arrangement, by container_id
+    _container_states = PlacementStates()
+
+    def __init__(self, container_dims: Dict[str, float], mode: str = PLACEMENT_MODE,
+                 cargo_rows: Optional[List[Dict]] = None):
+        """
+        The placer starts from the items in cargo_rows (the container's cargo
+        arrangement rows). With a container_id in container_dims the state
+        built from them is cached across placers; each find_optimal_placement
+        run starts again from that state.
+        """
+        if mode not in ("extreme_points", "heightmap", "grid"):
+            raise ValueError(f"Unknown placement mode: {mode}")
+        self.mode = mode
 
-    def __init__(self, container_dims: Dict[str, float]):
         # Convert dimensions to integers
         self.width_cm = int(container_dims["width_cm"])
         self.depth_cm = int(container_dims["depth_cm"])
         self.height_cm = int(container_dims["height_cm"])
+        dims = (self.width_cm, self.depth_cm, self.height_cm)
         
-        # Create a unique key for this container
-        self.container_key = f"{self.width_cm}x{self.depth_cm}x{self.height_cm}"
-        
-        # Initialize or retrieve existing state
-        if self.container_key not in self._container_states:
-            self._container_states[self.container_key] = {
-                'space_matrix': SparseMatrix(self.width_cm, self.depth_cm, self.height_cm),
-                'current_placements': {},
-                'rearrangement_history': []
-            }
-        
-        # Use the shared state
-        self.space_matrix = self._container_states[self.container_key]['space_matrix']
-        self.current_placements = self._container_states[self.container_key]['current_placements']
-        self.rearrangement_history = self._container_states[self.container_key]['rearrangement_history']
+        self.container_id = container_dims.get("container_id")
+        if self.container_id is None:
+            self.loaded_state = ContainerState.from_cargo(*dims, cargo_boxes(cargo_rows or []))
+        else:
+            self.loaded_state = self._container_states.get(str(self.container_id), dims, cargo_rows)
+        self._reset_state()
+        # Fit tests run, for comparing modes
+        self.probes = 0
         
         # Initialize without CSV loading
         self.items_dict = {}
@@ -336,6 +619,16 @@ class AdvancedCargoPlacement:
         self._dupe_cache = {}
         self.rotation_cache = {}
 
+    def _reset_state(self) -> None:
+        """Start over from a fresh copy of the loaded container state."""
+        self.state = self.loaded_state.copy()
+        self.space_matrix = self.state.space_matrix
+        self.current_placements = self.state.current_placements
+        self.rearrangement_history = self.state.rearrangement_history
+        # ExtremePoints or HeightMap of the boxes in space_matrix, as of space_matrix.version
+        self._free_space: Optional[Union[ExtremePoints, HeightMap]] = None
+        self._free_space_version = -1
+
     def _get_cached_item(self, item_id: str) -> Optional[Dict]:
         """Get cached item data with memoization"""
         if item_id not in self._item_cache:
@@ -423,7 +716,12 @@ class AdvancedCargoPlacement:
             pos.z + item_height > self.height_cm):
             return False
 
+        if self.mode != "grid":
+            self.probes += 1
+            return self.free_space().fits((pos.x, pos.y, pos.z), (item_width, item_depth, item_height))
+
         # Check if space is already occupied using sparse matrix
+        self.probes += 1
         return not self.space_matrix.is_occupied(
             pos.x, pos.y, pos.z,
             pos.x + item_width,
@@ -444,6 +742,19 @@ class AdvancedCargoPlacement:
             pos.y + item_depth,
             pos.z + item_height
         )
+        if self._free_space is not None and self._free_space_version == self.space_matrix.version - 1:
+            self._free_space.add((pos.x, pos.y, pos.z), (pos.x + item_width, pos.y + item_depth, pos.z + item_height))
+            self._free_space_version = self.space_matrix.version
+
+    def free_space(self) -> Union[ExtremePoints, HeightMap]:
+        """The mode's view of this container's placed boxes, rebuilt if space_matrix changed behind it."""
+        if self._free_space is None or self._free_space_version != self.space_matrix.version:
+            index = HeightMap if self.mode == "heightmap" else ExtremePoints
+            self._free_space = index.from_regions(
+                self.width_cm, self.depth_cm, self.height_cm, self.space_matrix.get_occupied_regions()
+            )
+            self._free_space_version = self.space_matrix.version
+        return self._free_space
 
     def get_90degree_rotations(self, item: ItemDimensions) -> List[Tuple[ItemDimensions, Rotation]]:
         """Get all valid 90-degree rotations for an item"""
@@ -617,6 +928,13 @@ class AdvancedCargoPlacement:
 
     def find_optimal_placement(self, items: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
         """Optimized placement algorithm with rearrangement support"""
+        # Every run starts from the container as arranged, not from earlier runs' placements,
+        # without the requested items' own boxes so they do not collide with themselves
+        self._reset_state()
+        self.state.release(item.get('item_id') for item in items)
+        return self._find_optimal_placement(items)
+
+    def _find_optimal_placement(self, items: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
         if not items:
             return [], []
 
@@ -765,6 +1083,33 @@ class AdvancedCargoPlacement:
                 
         return placements, rearrangements
 
+    def _find_free_position(self, item: ItemDimensions) -> Optional[Position3D]:
+        """First position where the item fits without rearrangement, in the configured mode"""
+        item_width = int(item.width_cm)
+        item_depth = int(item.depth_cm)
+        item_height = int(item.height_cm)
+
+        if self.mode != "grid":
+            free_space = self.free_space()
+            probes = free_space.probes
+            corner = free_space.find((item_width, item_depth, item_height))
+            self.probes += free_space.probes - probes
+            return Position3D(*corner) if corner is not None else None
+
+        grid_size = 10
+        z_limit = self.height_cm - item_height
+        for x in range(0, self.width_cm - item_width + 1, grid_size):
+            for y in range(0, self.depth_cm - item_depth + 1, grid_size):
+                z = 0
+                while z <= z_limit:
+                    self.probes += 1
+                    box = self.space_matrix.first_collision(x, y, z, x + item_width, y + item_depth, z + item_height)
+                    if box is None:
+                        return Position3D(x, y, z)
+                    # Every lattice point below the top of the colliding box collides with it too
+                    z += max(grid_size, math.ceil((box[5] - z) / grid_size) * grid_size)
+        return None
+
     def _find_best_position(self, item: ItemDimensions) -> Optional[Position3D]:
         """Optimized position finding with spatial partitioning"""
         # Use grid-based search
@@ -775,12 +1120,9 @@ class AdvancedCargoPlacement:
         item_height = int(item.height_cm)
         
         # First try to find a position that doesn't require rearrangement
-        for x in range(0, self.width_cm - item_width + 1, grid_size):
-            for y in range(0, self.depth_cm - item_depth + 1, grid_size):
-                for z in range(0, self.height_cm - item_height + 1, grid_size):
-                    pos = Position3D(x, y, z)
-                    if self._can_place_item(pos, item):
-                        return pos
+        pos = self._find_free_position(item)
+        if pos is not None:
+            return pos
         
         # If no direct position found, try to find a position that requires minimal rearrangement
         best_pos = None
@@ -4,58 +4,560 @@ from datetime import datetime
 import numpy as np
 import polars as pl
 import heapq
+import math
+import os
+import time
+
+# Planner backend: "graph" (FreeSpaceGraph) or "grid" (OccupancyGrid), and the
+# grid's cell size
+RETRIEVAL_BACKEND = os.environ.get("RETRIEVAL_BACKEND", "graph")
+RETRIEVAL_CELL_CM = float(os.environ.get("RETRIEVAL_CELL_CM", "1"))
+# Limits of a single path search; past either one the closest partial path is returned
+RETRIEVAL_MAX_NODES = int(os.environ.get("RETRIEVAL_MAX_NODES", "500000"))
+RETRIEVAL_MAX_SECONDS = float(os.environ.get("RETRIEVAL_MAX_SECONDS", "2.0"))
+
+# Format of the expiry_date column in imported_items.csv
+EXPIRY_DATE_FORMAT = "%d-%m-%y"
+
+Point = Tuple[int, int, int]
+# Occupied region in 1 cm cells: (low corner, high corner), high exclusive
+VoxelBox = Tuple[Point, Point]
+
+def voxels_to_boxes(voxels) -> List[VoxelBox]:
+    """Merge single occupied cells into boxes, one per run of consecutive heights."""
+    columns: Dict[Tuple[int, int], List[int]] = {}
+    for x, y, z in voxels:
+        columns.setdefault((int(x), int(y)), []).append(int(z))
+    boxes = []
+    for (x, y), heights in columns.items():
+        heights.sort()
+        run_start = previous = heights[0]
+        for z in heights[1:] + [None]:
+            if z is not None and z <= previous + 1:
+                previous = max(previous, z)
+                continue
+            boxes.append(((x, y, run_start), (x + 1, y + 1, previous + 1)))
+            if z is not None:
+                run_start = previous = z
+    return boxes
+
+def item_metadata(rows: List[Dict]) -> Dict[str, Dict]:
+    """
+    Item rows keyed by str(item_id), as PriorityAStarRetrieval reads them.
+    expiry_date is parsed once here into "expiry" (None when missing or
+    not a valid date).
+    """
+    metadata = {}
+    for row in rows:
+        item = dict(row)
+        item["expiry"] = None
+        if item.get("expiry_date"):
+            try:
+                item["expiry"] = datetime.strptime(item["expiry_date"], EXPIRY_DATE_FORMAT)
+            except (ValueError, TypeError):
+                # Handle invalid date formats gracefully
+                pass
+        metadata[str(item["item_id"])] = item
+    return metadata
+
+class SearchBudget:
+    """Node and wall-clock limits shared by the path searches."""
+
+    # The clock is read once per this many expanded nodes
+    CHECK_EVERY = 256
+
+    def __init__(self, max_nodes: Optional[int] = RETRIEVAL_MAX_NODES, max_seconds: Optional[float] = RETRIEVAL_MAX_SECONDS):
+        self.max_nodes = max_nodes
+        self.deadline = time.monotonic() + max_seconds if max_seconds else None
+        self.nodes_expanded = 0
+
+    def spend(self) -> bool:
+        """Count one expanded node; False once a limit is reached."""
+        if self.max_nodes and self.nodes_expanded >= self.max_nodes:
+            return False
+        self.nodes_expanded += 1
+        if self.deadline is not None and self.nodes_expanded % self.CHECK_EVERY == 0:
+            return time.monotonic() < self.deadline
+        return True
 
 @dataclass
-class RetrievalNode:
-    position: Tuple[int, int, int]
-    g_cost: float  # Cost from start
-    h_cost: float  # Heuristic cost to goal
-    f_cost: float  # Total cost (g + h)
-    parent: Optional['RetrievalNode'] = None
-    priority_bonus: float = 0.0  # Priority-based bonus
-    
-    def __lt__(self, other):
-        # For priority queue comparison
-        return (self.f_cost - self.priority_bonus) < (other.f_cost - other.priority_bonus)
+class SearchResult:
+    # Turning points of the path to the target, or (status "budget_exhausted")
+    # to the expanded node closest to it; None when unreachable
+    waypoints: Optional[List[Point]]
+    cost: float
+    status: str  # "found", "unreachable" or "budget_exhausted"
+    nodes_expanded: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.status == "found"
+
+def flood_reaches(open_cells: np.ndarray, start: Tuple[int, int, int], target: Tuple[int, int, int]) -> bool:
+    """Whether target is 6-connected to start through the True cells of a 3D array."""
+    padded = np.zeros(tuple(size + 2 for size in open_cells.shape), dtype=bool)
+    padded[1:-1, 1:-1, 1:-1] = open_cells
+    strides = (padded.shape[1] * padded.shape[2], padded.shape[2], 1)
+    offsets = np.array([stride * sign for stride in strides for sign in (-1, 1)], dtype=np.int64)
+    unreached = padded.ravel()
+    start_index = sum((start[axis] + 1) * strides[axis] for axis in range(3))
+    target_index = sum((target[axis] + 1) * strides[axis] for axis in range(3))
+    if not unreached[start_index] or not unreached[target_index]:
+        return False
+    unreached[start_index] = False
+    frontier = np.array([start_index], dtype=np.int64)
+    while frontier.size and unreached[target_index]:
+        neighbors = (frontier[:, None] + offsets[None, :]).ravel()
+        frontier = np.unique(neighbors[unreached[neighbors]])
+        unreached[frontier] = False
+    return not unreached[target_index]
+
+def box_corners(box) -> Tuple[Tuple[float, float, float], Tuple[float, float, float]]:
+    """Start and end corners of a request box: a Position-style dict or a pair of [x, y, z] lists."""
+    if isinstance(box, dict):
+        start, end = box["startCoordinates"], box["endCoordinates"]
+        return (
+            (float(start["width_cm"]), float(start["depth_cm"]), float(start["height_cm"])),
+            (float(end["width_cm"]), float(end["depth_cm"]), float(end["height_cm"]))
+        )
+    start, end = box
+    if len(start) != 3 or len(end) != 3:
+        raise ValueError(f"Invalid box: {box}")
+    return tuple(float(value) for value in start), tuple(float(value) for value in end)
+
+class FreeSpaceGraph:
+    """
+    Coarse graph of the free space in a container, for shortest paths
+    between 1 cm cells with 6-neighbour moves.
+
+    Each axis is cut only at the coordinates where something can change:
+    the container bounds, the given points and their neighbours, and the
+    cells on either side of every box face (lo - 1, lo, hi - 1, hi). Nodes are the cells at those
+    cut coordinates. Between two neighbouring nodes no box face is crossed,
+    so if both are free the straight segment between them is free, and its
+    cost is its length in cells. Shortest paths on this graph have the same
+    length as on the full 1 cm grid, but the graph grows with the number of
+    boxes instead of the container volume.
+    """
+
+    def __init__(self, dims: Point, boxes: List[VoxelBox], points: List[Point]):
+        self.dims = dims
+        cuts = []
+        for axis in range(3):
+            values = {0, dims[axis] - 1}
+            for point in points:
+                # Neighbours included, so a point inside a box can be freed on its own (set_free)
+                values.update((point[axis] - 1, point[axis], point[axis] + 1))
+            for low, high in boxes:
+                values.update((low[axis] - 1, low[axis], high[axis] - 1, high[axis]))
+            cuts.append(np.array(sorted(v for v in values if 0 <= v < dims[axis]), dtype=np.int64))
+        self.cuts = cuts
+        self.shape = tuple(len(axis_cuts) for axis_cuts in cuts)
+
+        occupied = np.zeros(self.shape, dtype=bool)
+        for low, high in boxes:
+            # Nodes whose cell lies inside the box: low <= cut <= high - 1
+            ranges = [
+                slice(int(np.searchsorted(cuts[axis], low[axis], "left")),
+                      int(np.searchsorted(cuts[axis], high[axis] - 1, "right")))
+                for axis in range(3)
+            ]
+            occupied[tuple(ranges)] = True
+        self.occupied = occupied
+        self._free = (~occupied).ravel().tolist()
+        self._strides = (self.shape[1] * self.shape[2], self.shape[2], 1)
+
+    def node(self, point: Point) -> Optional[int]:
+        """Flat index of the node at point (which must lie on the cuts), or None outside."""
+        index = 0
+        for axis in range(3):
+            axis_cuts = self.cuts[axis]
+            i = int(np.searchsorted(axis_cuts, point[axis]))
+            if i >= len(axis_cuts) or axis_cuts[i] != point[axis]:
+                return None
+            index += i * self._strides[axis]
+        return index
+
+    def point(self, node: int) -> Point:
+        i, rest = divmod(node, self._strides[0])
+        j, k = divmod(rest, self._strides[1])
+        return (int(self.cuts[0][i]), int(self.cuts[1][j]), int(self.cuts[2][k]))
+
+    def is_free(self, node: int) -> bool:
+        return self._free[node]
+
+    def set_free(self, node: int) -> None:
+        self._free[node] = True
+        self.occupied.ravel()[node] = False
+
+    def indexes(self, node: int) -> Tuple[int, int, int]:
+        i, rest = divmod(node, self._strides[0])
+        j, k = divmod(rest, self._strides[1])
+        return i, j, k
+
+    def connected(self, start: int, target: int) -> bool:
+        """Connectivity precheck: whether any path joins the two nodes."""
+        return flood_reaches(~self.occupied, self.indexes(start), self.indexes(target))
+
+    def shortest_path(self, start: int, target: int, budget: Optional[SearchBudget] = None) -> SearchResult:
+        """A* from start to target within budget; waypoints are the points where the path turns."""
+        budget = budget or SearchBudget(None, None)
+        cuts = [axis_cuts.tolist() for axis_cuts in self.cuts]
+        strides, shape, free = self._strides, self.shape, self._free
+        target_point = self.point(target)
+
+        def heuristic(coords: Point) -> int:
+            return abs(coords[0] - target_point[0]) + abs(coords[1] - target_point[1]) + abs(coords[2] - target_point[2])
+
+        def path_to(node: int) -> List[Point]:
+            path = []
+            while node is not None:
+                path.append(self.point(node))
+                node = parents[node]
+            path.reverse()
+            return path
+
+        start_h = heuristic(self.point(start))
+        g_costs = {start: 0}
+        parents = {start: None}
+        # Ties on f go to the node closest to the target
+        open_heap = [(start_h, start_h, start)]
+        closed = set()
+        closest = (start_h, start)
+        while open_heap:
+            _, h_current, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            if current == target:
+                return SearchResult(path_to(target), g_costs[target], "found", budget.nodes_expanded)
+            if not budget.spend():
+                return SearchResult(path_to(closest[1]), g_costs[closest[1]], "budget_exhausted", budget.nodes_expanded)
+            closed.add(current)
+            closest = min(closest, (h_current, current))
+            position = self.indexes(current)
+            g_cost = g_costs[current]
+            for axis in range(3):
+                for step in (-1, 1):
+                    index = position[axis] + step
+                    if not 0 <= index < shape[axis]:
+                        continue
+                    neighbor = current + step * strides[axis]
+                    if not free[neighbor] or neighbor in closed:
+                        continue
+                    new_cost = g_cost + abs(cuts[axis][index] - cuts[axis][position[axis]])
+                    if new_cost < g_costs.get(neighbor, new_cost + 1):
+                        g_costs[neighbor] = new_cost
+                        parents[neighbor] = current
+                        coords = [cuts[0][position[0]], cuts[1][position[1]], cuts[2][position[2]]]
+                        coords[axis] = cuts[axis][index]
+                        h_cost = heuristic(coords)
+                        heapq.heappush(open_heap, (new_cost + h_cost, h_cost, neighbor))
+        return SearchResult(None, 0, "unreachable", budget.nodes_expanded)
+
+class OccupancyGrid:
+    """
+    Dense occupancy of a container as a NumPy boolean array, one byte per
+    cell of cell_cm per side, with a one-cell occupied border so neighbour
+    lookups never need bounds checks.
+
+    Boxes are rasterized with one slice assignment each; a cell partly
+    covered by a box counts as occupied. Cells are addressed by their flat
+    index into the padded array.
+    """
+
+    def __init__(self, dims_cm: Tuple[float, float, float], cell_cm: float = 1.0):
+        self.cell_cm = float(cell_cm)
+        self.shape = tuple(max(1, int(math.ceil(float(dim) / self.cell_cm))) for dim in dims_cm)
+        self.occupied = np.ones(tuple(size + 2 for size in self.shape), dtype=bool)
+        self.occupied[1:-1, 1:-1, 1:-1] = False
+        padded = self.occupied.shape
+        self.strides = (padded[1] * padded[2], padded[2], 1)
+        self._free: Optional[bytearray] = None
+
+    @classmethod
+    def from_cargo(cls, container_dims: dict, cargo_rows: List[Dict], cell_cm: float = 1.0,
+                   exclude_item_ids: Optional[Set[int]] = None) -> "OccupancyGrid":
+        """Grid of a container from its cargo rows (typed start_/end_ position columns)."""
+        grid = cls((container_dims["width_cm"], container_dims["depth_cm"], container_dims["height_cm"]), cell_cm)
+        for row in cargo_rows:
+            if exclude_item_ids and row.get("item_id") in exclude_item_ids:
+                continue
+            grid.add_box(
+                (row["start_x_cm"], row["start_y_cm"], row["start_z_cm"]),
+                (row["end_x_cm"], row["end_y_cm"], row["end_z_cm"])
+            )
+        return grid
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.occupied.nbytes)
+
+    def cell(self, pos_cm: Tuple[float, float, float]) -> Tuple[int, int, int]:
+        return tuple(int(math.floor(float(value) / self.cell_cm)) for value in pos_cm)
+
+    def in_bounds(self, cell: Tuple[int, int, int]) -> bool:
+        return all(0 <= cell[axis] < self.shape[axis] for axis in range(3))
+
+    def cell_box(self, start_cm: Tuple[float, float, float], end_cm: Tuple[float, float, float]) -> VoxelBox:
+        """Cells covered (even partly) by a box in cm, clipped to the grid; high exclusive."""
+        low = tuple(max(0, int(math.floor(float(value) / self.cell_cm))) for value in start_cm)
+        high = tuple(min(size, int(math.ceil(float(value) / self.cell_cm))) for value, size in zip(end_cm, self.shape))
+        return low, high
+
+    def add_box(self, start_cm: Tuple[float, float, float], end_cm: Tuple[float, float, float]) -> None:
+        low, high = self.cell_box(start_cm, end_cm)
+        self.occupied[low[0] + 1:high[0] + 1, low[1] + 1:high[1] + 1, low[2] + 1:high[2] + 1] = True
+        self._free = None
+
+    def add_cells(self, cells) -> None:
+        cells = np.asarray(list(cells), dtype=np.int64).reshape(-1, 3)
+        cells = cells[np.all((cells >= 0) & (cells < np.array(self.shape)), axis=1)]
+        self.occupied[cells[:, 0] + 1, cells[:, 1] + 1, cells[:, 2] + 1] = True
+        self._free = None
+
+    def index(self, cell: Tuple[int, int, int]) -> int:
+        return (cell[0] + 1) * self.strides[0] + (cell[1] + 1) * self.strides[1] + cell[2] + 1
+
+    def cell_of(self, index: int) -> Tuple[int, int, int]:
+        x, rest = divmod(index, self.strides[0])
+        y, z = divmod(rest, self.strides[1])
+        return (x - 1, y - 1, z - 1)
+
+    def is_free(self, cell: Tuple[int, int, int]) -> bool:
+        return self.in_bounds(cell) and not self.occupied[cell[0] + 1, cell[1] + 1, cell[2] + 1]
+
+    def set_free(self, cell: Tuple[int, int, int]) -> None:
+        if self.in_bounds(cell):
+            self.occupied[cell[0] + 1, cell[1] + 1, cell[2] + 1] = False
+            self._free = None
+
+    def free_cells(self) -> bytearray:
+        """Flat free mask (1 = free), indexable by cell index; rebuilt after changes."""
+        if self._free is None:
+            self._free = bytearray((~self.occupied).ravel().tobytes())
+        return self._free
+
+    @property
+    def offsets(self) -> List[int]:
+        """Flat index offsets of the six neighbours of a cell."""
+        return [stride * sign for stride in self.strides for sign in (-1, 1)]
+
+    def distance_field(self, start: Tuple[int, int, int]) -> "DistanceField":
+        """
+        Breadth-first flood from start over the free cells, one NumPy step
+        per distance: every cell gets its distance and the neighbour it was
+        reached from.
+        """
+        # Free cells not reached yet
+        unreached = ~self.occupied.ravel()
+        distance = np.full(unreached.size, -1, dtype=np.int32)
+        parent = np.full(unreached.size, -1, dtype=np.int8)
+        index_type = np.int32 if unreached.size < 2 ** 31 else np.int64
+        offsets = np.array(self.offsets, dtype=index_type)
+        codes = np.arange(len(offsets), dtype=np.int8)
+        start_index = self.index(start)
+        distance[start_index] = 0
+        unreached[start_index] = False
+        frontier = np.array([start_index], dtype=index_type)
+        step = 0
+        while frontier.size:
+            step += 1
+            neighbors = (frontier[:, None] + offsets[None, :]).ravel()
+            new = unreached[neighbors]
+            neighbors = neighbors[new]
+            reached_by = np.broadcast_to(codes, (frontier.size, len(codes))).ravel()[new]
+            # Cells reached twice in this step keep their last write; tag the
+            # writes in distance itself to find them without sorting
+            tags = -2 - np.arange(neighbors.size, dtype=np.int32)
+            distance[neighbors] = tags
+            kept = distance[neighbors] == tags
+            frontier = neighbors[kept]
+            distance[frontier] = step
+            parent[frontier] = reached_by[kept]
+            unreached[frontier] = False
+        return DistanceField(self, start, distance, parent)
+
+    def shortest_path(self, start: Tuple[int, int, int], target: Tuple[int, int, int],
+                      budget: Optional[SearchBudget] = None) -> SearchResult:
+        """A* between two free cells within budget; waypoints are the cells where the path turns, cost in cells."""
+        budget = budget or SearchBudget(None, None)
+        free = self.free_cells()
+        offsets = self.offsets
+        start_index, target_index = self.index(start), self.index(target)
+        tx, ty, tz = target
+        strides = self.strides
+
+        def heuristic(index: int) -> int:
+            x, rest = divmod(index, strides[0])
+            y, z = divmod(rest, strides[1])
+            return abs(x - 1 - tx) + abs(y - 1 - ty) + abs(z - 1 - tz)
+
+        def path_to(index: int) -> List[Tuple[int, int, int]]:
+            cells = []
+            while index is not None:
+                cells.append(self.cell_of(index))
+                index = parents[index]
+            cells.reverse()
+            return turning_points(cells)
+
+        start_h = heuristic(start_index)
+        g_costs = {start_index: 0}
+        parents = {start_index: None}
+        open_heap = [(start_h, start_h, start_index)]
+        closed = set()
+        closest = (start_h, start_index)
+        while open_heap:
+            _, h_current, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            if current == target_index:
+                return SearchResult(path_to(current), g_costs[current], "found", budget.nodes_expanded)
+            if not budget.spend():
+                return SearchResult(path_to(closest[1]), g_costs[closest[1]], "budget_exhausted", budget.nodes_expanded)
+            closed.add(current)
+            closest = min(closest, (h_current, current))
+            g_cost = g_costs[current] + 1
+            for offset in offsets:
+                neighbor = current + offset
+                # The occupied border stops every walk at the container walls
+                if not free[neighbor] or neighbor in closed:
+                    continue
+                if g_cost < g_costs.get(neighbor, g_cost + 1):
+                    g_costs[neighbor] = g_cost
+                    parents[neighbor] = current
+                    h_cost = heuristic(neighbor)
+                    heapq.heappush(open_heap, (g_cost + h_cost, h_cost, neighbor))
+        return SearchResult(None, 0, "unreachable", budget.nodes_expanded)
+
+class DistanceField:
+    """
+    Distances (in cells) from one start cell to every free cell of an
+    OccupancyGrid, with parent pointers stored as the index of the
+    neighbour offset each cell was reached through. Any number of targets
+    can be answered from one field.
+    """
+
+    def __init__(self, grid: OccupancyGrid, start: Tuple[int, int, int], distance: np.ndarray, parent: np.ndarray):
+        self.grid = grid
+        self.start = start
+        self.distance = distance
+        self.parent = parent
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.distance.nbytes + self.parent.nbytes)
+
+    def cost(self, target: Tuple[int, int, int]) -> Optional[int]:
+        """Length in cells of the shortest path to target; None if unreachable."""
+        if not self.grid.in_bounds(target):
+            return None
+        distance = int(self.distance[self.grid.index(target)])
+        return distance if distance >= 0 else None
+
+    def path(self, target: Tuple[int, int, int]) -> Optional[Tuple[List[Tuple[int, int, int]], int]]:
+        """Shortest path to target as the cells where it turns, and its length in cells."""
+        cost = self.cost(target)
+        if cost is None:
+            return None
+        offsets = self.grid.offsets
+        parent = self.parent
+        index = self.grid.index(target)
+        cells = [target]
+        for _ in range(cost):
+            index -= offsets[parent[index]]
+            cells.append(self.grid.cell_of(index))
+        cells.reverse()
+        return turning_points(cells), cost
+
+def turning_points(cells: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """Drop the cells in the middle of straight runs of a path."""
+    points = cells[:2]
+    for cell in cells[2:]:
+        a, b = points[-2], points[-1]
+        if sum(1 for axis in range(3) if a[axis] == b[axis] == cell[axis]) == 2:
+            points[-1] = cell
+        else:
+            points.append(cell)
+    return points
+
+# Request values of pathFormat for handle_retrieve_request
+PATH_FORMATS = ("segments", "steps", "summary")
 
 @dataclass
 class RetrievalPath:
-    steps: List[Dict]
+    # Straight runs along one axis: {"from", "to", "direction", "length"}
+    segments: List[Dict]
     total_cost: float
     priority_score: float
     safety_score: float
+    # False when the search budget ran out and the path ends short of the target
+    complete: bool = True
+    nodes_expanded: int = 0
+    item_id: str = ""
+    step_cm: float = 1
+
+    def steps(self) -> List[Dict]:
+        """The path expanded to one dict per step_cm move (the older, verbose output)."""
+        steps = []
+        for segment in self.segments:
+            position = list(segment["from"])
+            axis = next(axis for axis, sign in enumerate(segment["direction"]) if sign)
+            delta = segment["direction"][axis] * self.step_cm
+            for _ in range(int(round(segment["length"] / self.step_cm))):
+                previous = tuple(position)
+                position[axis] += delta
+                steps.append({
+                    "from": previous,
+                    "to": tuple(position),
+                    "item_id": self.item_id,
+                    "priority": self.priority_score
+                })
+        return steps
 
 class PriorityAStarRetrieval:
-    def __init__(self, container_dims: dict):
-        """Initialize with container dimensions"""
+    def __init__(self, container_dims: dict, backend: str = RETRIEVAL_BACKEND, cell_cm: float = RETRIEVAL_CELL_CM,
+                 max_nodes: Optional[int] = RETRIEVAL_MAX_NODES, max_seconds: Optional[float] = RETRIEVAL_MAX_SECONDS,
+                 items_data: Optional[Dict[str, Dict]] = None):
+        """
+        Initialize with container dimensions. items_data is shared item
+        metadata as built by item_metadata; by default it is taken from
+        inventory_store.item_metadata().
+        """
         # Convert dimensions to integers
         self.width_cm = int(container_dims["width_cm"])
         self.depth_cm = int(container_dims["depth_cm"])
         self.height_cm = int(container_dims["height_cm"])
         
-        # Initialize occupied spaces set
+        # Occupied 1 cm cells, as single cells and as boxes (see add_occupied_box)
         self.occupied_spaces = set()
+        self.occupied_boxes: List[VoxelBox] = []
         
-        # Initialize priority queue for A* search
-        self.priority_queue = []
-        
-        # Initialize visited nodes set
-        self.visited = set()
+        if backend not in ("graph", "grid"):
+            raise ValueError(f"Unknown retrieval backend: {backend}")
+        self.backend = backend
+        self.cell_cm = float(cell_cm) if backend == "grid" else 1.0
+        # Bytes held by the occupancy structure of the last search
+        self.memory_bytes = 0
+        # Distance fields by start cell, dropped whenever the occupancy changes
+        self._fields: Dict[Tuple[int, int, int], DistanceField] = {}
+        self._field_grid: Optional[OccupancyGrid] = None
+        self._fields_key = None
+        self._occupancy_version = 0
+        # Budget of each find_retrieval_path search, and how the last one ended
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.last_search: Optional[SearchResult] = None
         
-        self.items_data = {}
-        # Pre-compute direction vectors for neighbor calculation
-        self.directions = [(0,0,1), (0,0,-1), (0,1,0), (0,-1,0), (1,0,0), (-1,0,0)]
-        self.load_items_data()
+        self.items_data = items_data
+        if items_data is None:
+            self.load_items_data()
 
     def load_items_data(self):
-        """Load and cache items data from CSV using Polars for faster processing"""
+        """Item metadata from the shared inventory store"""
+        # Imported here: the store itself imports item_metadata from this module
+        from storage.inventory_store import inventory_store
         try:
-            # Using Polars' lazy evaluation for better performance
-            items_df = pl.scan_csv("imported_items.csv").collect()
-            self.items_data = {
-                str(row["item_id"]): row 
-                for row in items_df.to_dicts()
-            }
+            self.items_data = inventory_store.item_metadata()
         except Exception as e:
             print(f"Error loading items data: {str(e)}")
             # Initialize with empty dict to prevent further errors
@@ -72,15 +574,10 @@ class PriorityAStarRetrieval:
 
         # Expiry date factor
         expiry_score = 1.0
-        if "expiry_date" in item and item["expiry_date"]:
-            try:
-                expiry = datetime.strptime(item["expiry_date"], "%d-%m-%y")
-                days_until_expiry = (expiry - datetime.now()).days
-                # Higher priority for items expiring sooner
-                expiry_score = max(0.1, min(1.0, 1 - (days_until_expiry / 365)))
-            except (ValueError, TypeError):
-                # Handle invalid date formats gracefully
-                pass
+        if item.get("expiry") is not None:
+            days_until_expiry = (item["expiry"] - datetime.now()).days
+            # Higher priority for items expiring sooner
+            expiry_score = max(0.1, min(1.0, 1 - (days_until_expiry / 365)))
 
         # Usage limit factor
         usage_score = 0.5
@@ -105,24 +602,31 @@ class PriorityAStarRetrieval:
         x2, y2, z2 = pos2
         return abs(x1 - x2) + abs(y1 - y2) + abs(z1 - z2)
 
-    def get_neighbors(self, pos: Tuple[int, int, int]) -> List[Tuple[int, int, int]]:
-        """Get valid neighboring positions - optimized version"""
-        x, y, z = pos
-        # Pre-allocate for performance
-        neighbors = []
-        neighbors_append = neighbors.append  # Local function reference for speed
-        
-        for dx, dy, dz in self.directions:
-            new_x, new_y, new_z = x + dx, y + dy, z + dz
-            # Bounds checking first (faster than creating tuple then checking)
-            if (0 <= new_x < self.width_cm and 
-                0 <= new_y < self.depth_cm and 
-                0 <= new_z < self.height_cm):
-                new_pos = (new_x, new_y, new_z)
-                if new_pos not in self.occupied_spaces:
-                    neighbors_append(new_pos)
-                    
-        return neighbors
+    def add_occupied_box(self, start: Tuple[float, float, float], end: Tuple[float, float, float]) -> None:
+        """Mark the cells of an item box (start and end corners in cm) as occupied."""
+        self.occupied_boxes.append((
+            (int(start[0]), int(start[1]), int(start[2])),
+            (int(end[0]), int(end[1]), int(end[2]))
+        ))
+        self._occupancy_version += 1
+
+    def occupy_cargo(self, cargo_rows: List[Dict], exclude_item_ids: Optional[Set[int]] = None) -> None:
+        """Mark the boxes of cargo rows (typed start_/end_ position columns) as occupied."""
+        for row in cargo_rows:
+            if exclude_item_ids and row.get("item_id") in exclude_item_ids:
+                continue
+            self.add_occupied_box(
+                (row["start_x_cm"], row["start_y_cm"], row["start_z_cm"]),
+                (row["end_x_cm"], row["end_y_cm"], row["end_z_cm"])
+            )
+
+    def is_occupied(self, pos: Tuple[int, int, int]) -> bool:
+        if pos in self.occupied_spaces:
+            return True
+        return any(
+            all(low[axis] <= pos[axis] < high[axis] for axis in range(3))
+            for low, high in self.occupied_boxes
+        )
 
     def is_valid_position(self, pos: Tuple[float, float, float]) -> bool:
         """Check if position is valid and unoccupied"""
@@ -142,7 +646,7 @@ class PriorityAStarRetrieval:
         # Check if the position is occupied
         # Convert to integer coordinates for occupied spaces check
         pos_int = (x_int, y_int, z_int)
-        if pos_int in self.occupied_spaces:
+        if self.is_occupied(pos_int):
             print(f"Position {pos} is occupied")
             return False
             
@@ -158,6 +662,77 @@ class PriorityAStarRetrieval:
         start_pos_int = (int(start_pos[0]), int(start_pos[1]), int(start_pos[2]))
         target_pos_int = (int(target_pos[0]), int(target_pos[1]), int(target_pos[2]))
         
+        self.last_search = SearchResult(None, 0, "unreachable")
+        if not self._valid_endpoints(start_pos, target_pos):
+            return None
+
+        start_free = self.is_occupied(start_pos_int) and start_pos == (0, 0, 0)
+        if self.backend == "grid":
+            result = self._grid_path(start_pos, target_pos, start_free)
+        else:
+            result = self._graph_path(start_pos_int, target_pos_int, start_free)
+        self.last_search = result
+        if result.waypoints is None:
+            print(f"No path found from {start_pos} to {target_pos} ({result.nodes_expanded} nodes expanded)")
+            return None  # No path found
+
+        if result.complete:
+            print(f"Path found with cost {result.cost} ({result.nodes_expanded} nodes expanded)")
+        else:
+            print(f"Search budget exhausted after {result.nodes_expanded} nodes; partial path with cost {result.cost}")
+        path = self.reconstruct_path(result.waypoints, result.cost, item_id)
+        path.complete = result.complete
+        path.nodes_expanded = result.nodes_expanded
+        return path
+
+    def find_retrieval_paths(self, start_pos: Tuple[float, float, float],
+                             targets: List[Tuple[Tuple[float, float, float], str]]) -> List[Optional[RetrievalPath]]:
+        """
+        Paths from one entry point to several (target position, item_id)
+        pairs, all answered from a single distance field over the occupancy
+        grid. The field is kept until the occupancy changes.
+        """
+        start_pos_int = (int(start_pos[0]), int(start_pos[1]), int(start_pos[2]))
+        field = self.distance_field(start_pos, self.is_occupied(start_pos_int) and start_pos == (0, 0, 0))
+        paths = []
+        for target_pos, item_id in targets:
+            result = None
+            if field is not None and self._valid_endpoints(start_pos, target_pos):
+                result = field.path(field.grid.cell(target_pos))
+            if result is None:
+                print(f"No path found from {start_pos} to {target_pos}")
+                paths.append(None)
+                continue
+            cells, length = result
+            paths.append(self.reconstruct_path(self._cells_to_cm(field.grid, cells), length * field.grid.cell_cm, item_id))
+        return paths
+
+    def distance_field(self, start_pos: Tuple[float, float, float], start_free: bool = False) -> Optional[DistanceField]:
+        """Cached distance field from start_pos; None if the start cell is not free."""
+        key = (self._occupancy_version, len(self.occupied_boxes), self.cell_cm)
+        if key != self._fields_key:
+            self._fields = {}
+            self._field_grid = self.occupancy_grid()
+            self._fields_key = key
+        grid = self._field_grid
+        start = grid.cell(start_pos)
+        if start not in self._fields:
+            if start_free and not grid.is_free(start):
+                # A copy with the entry cell opened up, as find_retrieval_path does
+                grid = self.occupancy_grid()
+                grid.set_free(start)
+            if not grid.is_free(start):
+                return None
+            self._fields[start] = grid.distance_field(start)
+            print(f"Distance field from {start}: {grid.shape} cells, {self._fields[start].nbytes} bytes")
+        field = self._fields[start]
+        self.memory_bytes = field.grid.nbytes + sum(cached.nbytes for cached in self._fields.values())
+        return field
+
+    def _valid_endpoints(self, start_pos: Tuple[float, float, float], target_pos: Tuple[float, float, float]) -> bool:
+        start_pos_int = (int(start_pos[0]), int(start_pos[1]), int(start_pos[2]))
+        target_pos_int = (int(target_pos[0]), int(target_pos[1]), int(target_pos[2]))
+
         print(f"Container dimensions: {self.width_cm}x{self.depth_cm}x{self.height_cm}")
         print(f"Converted positions - start: {start_pos_int}, target: {target_pos_int}")
         
@@ -170,7 +745,7 @@ class PriorityAStarRetrieval:
                 # Make sure it's not in occupied spaces
                 self.occupied_spaces.discard(start_pos_int)
             else:
-                return None
+                return False
                 
         if not self.is_valid_position(target_pos):
             print(f"Invalid target position: {target_pos}")
@@ -181,143 +756,197 @@ class PriorityAStarRetrieval:
                 0 <= target_pos_int[2] <= self.height_cm + 5):
                 print(f"Target position slightly out of bounds but within tolerance - proceeding")
             else:
-                return None
+                return False
 
-        # Using priority queue instead of set + min search
-        open_pq = []
-        open_set = set([start_pos_int])
-        closed_set = set()
-        
-        # Priority bonus for the target item
-        priority_bonus = self.calculate_priority_score(item_id)
-        
-        h_cost = self.manhattan_distance(start_pos_int, target_pos_int)
-        start_node = RetrievalNode(
-            position=start_pos_int,
-            g_cost=0,
-            h_cost=h_cost,
-            f_cost=h_cost,  # f_cost = g_cost + h_cost
-            priority_bonus=priority_bonus
+        return True
+
+    def _budget(self) -> SearchBudget:
+        return SearchBudget(self.max_nodes, self.max_seconds)
+
+    def _graph_path(self, start: Point, target: Point, start_free: bool) -> SearchResult:
+        """Search a coarse graph of the free space rather than cell by cell."""
+        graph = FreeSpaceGraph(
+            (self.width_cm, self.depth_cm, self.height_cm),
+            self.occupied_boxes + voxels_to_boxes(self.occupied_spaces),
+            [start, target]
         )
-        
-        # Using dictionary for O(1) node lookups
-        nodes = {start_pos_int: start_node}
-        
-        # Add start node to priority queue
-        heapq.heappush(open_pq, start_node)
-        
-        while open_pq:
-            current = heapq.heappop(open_pq)
-            current_pos = current.position
-            
-            # Node may have been updated with a better path after being added to queue
-            if current.f_cost - current.priority_bonus > nodes[current_pos].f_cost - nodes[current_pos].priority_bonus:
-                continue
-                
-            if current_pos == target_pos_int:
-                print(f"Path found with {current.g_cost} steps")
-                return self.reconstruct_path(current, item_id)
-            
-            # Safely remove from open_set if it exists
-            if current_pos in open_set:
-                open_set.remove(current_pos)
-            closed_set.add(current_pos)
-            
-            for neighbor_pos in self.get_neighbors(current_pos):
-                if neighbor_pos in closed_set:
-                    continue
-                
-                g_cost = current.g_cost + 1  # Assuming uniform cost for movement
-                
-                if neighbor_pos not in open_set:
-                    h_cost = self.manhattan_distance(neighbor_pos, target_pos_int)
-                    f_cost = g_cost + h_cost
-                    
-                    neighbor = RetrievalNode(
-                        position=neighbor_pos,
-                        g_cost=g_cost,
-                        h_cost=h_cost,
-                        f_cost=f_cost,  # Explicitly calculate f_cost
-                        priority_bonus=priority_bonus,
-                        parent=current
-                    )
-                    
-                    nodes[neighbor_pos] = neighbor
-                    open_set.add(neighbor_pos)
-                    heapq.heappush(open_pq, neighbor)
-                    
-                elif g_cost < nodes[neighbor_pos].g_cost:
-                    # Better path found, update node
-                    neighbor = nodes[neighbor_pos]
-                    neighbor.g_cost = g_cost
-                    neighbor.f_cost = g_cost + neighbor.h_cost
-                    neighbor.parent = current
-                    
-                    # Re-add to priority queue with updated priority
-                    heapq.heappush(open_pq, neighbor)
-        
-        print(f"No path found from {start_pos} to {target_pos}")
-        return None  # No path found
+        self.memory_bytes = int(graph.occupied.nbytes)
+        print(f"Free space graph: {graph.shape} nodes, {self.memory_bytes} bytes")
+        start_node = graph.node(start)
+        target_node = graph.node(target)
+        if start_node is not None and start_free:
+            graph.set_free(start_node)
+        if start_node is None or target_node is None or not graph.is_free(start_node) or not graph.is_free(target_node):
+            return SearchResult(None, 0, "unreachable")
+        if not graph.connected(start_node, target_node):
+            print("Target is not connected to the start")
+            return SearchResult(None, 0, "unreachable")
+        return graph.shortest_path(start_node, target_node, self._budget())
 
-    def reconstruct_path(self, final_node: RetrievalNode, item_id: str) -> RetrievalPath:
-        """Reconstruct the retrieval path with steps"""
-        path = []
-        current = final_node
-        
-        while current.parent:
-            path.append({
-                "from": current.parent.position,
-                "to": current.position,
-                "item_id": item_id,
-                "priority": self.calculate_priority_score(item_id)
-            })
-            current = current.parent
+    def occupancy_grid(self) -> OccupancyGrid:
+        """Dense grid of everything marked occupied, at cell_cm resolution."""
+        grid = OccupancyGrid((self.width_cm, self.depth_cm, self.height_cm), self.cell_cm)
+        for low, high in self.occupied_boxes:
+            grid.add_box(low, high)
+        if self.occupied_spaces:
+            if self.cell_cm == 1.0:
+                grid.add_cells(self.occupied_spaces)
+            else:
+                for low, high in voxels_to_boxes(self.occupied_spaces):
+                    grid.add_box(low, high)
+        return grid
+
+    def _grid_path(self, start_pos: Tuple[float, float, float], target_pos: Tuple[float, float, float],
+                   start_free: bool) -> SearchResult:
+        """Search the dense occupancy grid cell by cell; positions and cost in cm."""
+        grid = self.occupancy_grid()
+        self.memory_bytes = grid.nbytes
+        print(f"Occupancy grid: {grid.shape} cells of {grid.cell_cm} cm, {self.memory_bytes} bytes")
+        start, target = grid.cell(start_pos), grid.cell(target_pos)
+        if start_free:
+            grid.set_free(start)
+        if not grid.is_free(start) or not grid.is_free(target):
+            return SearchResult(None, 0, "unreachable")
+        # The precheck floods the coarse graph of the same boxes in cell units
+        # rather than every cell of the grid
+        cell_boxes = [grid.cell_box(low, high) for low, high in self.occupied_boxes + voxels_to_boxes(self.occupied_spaces)]
+        graph = FreeSpaceGraph(grid.shape, cell_boxes, [start, target])
+        if start_free:
+            graph.set_free(graph.node(start))
+        if not graph.connected(graph.node(start), graph.node(target)):
+            print("Target is not connected to the start")
+            return SearchResult(None, 0, "unreachable")
+        result = grid.shortest_path(start, target, self._budget())
+        if result.waypoints is not None:
+            result.waypoints = self._cells_to_cm(grid, result.waypoints)
+            result.cost *= grid.cell_cm
+        return result
+
+    @staticmethod
+    def _cells_to_cm(grid: OccupancyGrid, cells: List[Tuple[int, int, int]]) -> List[Tuple[float, float, float]]:
+        if grid.cell_cm.is_integer():
+            return [tuple(value * int(grid.cell_cm) for value in cell) for cell in cells]
+        return [tuple(value * grid.cell_cm for value in cell) for cell in cells]
+
+    def memory_report(self) -> Dict:
+        """Occupancy memory of this container's planner (as of the last search)."""
+        return {
+            "backend": self.backend,
+            "cell_cm": self.cell_cm,
+            "container_cm": [self.width_cm, self.depth_cm, self.height_cm],
+            "bytes": self.memory_bytes
+        }
+
+    def reconstruct_path(self, waypoints: List[Point], total_cost: float, item_id: str) -> RetrievalPath:
+        """Reconstruct the retrieval path as straight segments between waypoints"""
+        segments = []
         
-        path.reverse()
+        # Waypoints differing on several axes are walked one axis at a time;
+        # runs along the same direction are merged
+        for start, end in zip(waypoints, waypoints[1:]):
+            position = list(start)
+            for axis in range(3):
+                if end[axis] == position[axis]:
+                    continue
+                direction = [0, 0, 0]
+                direction[axis] = 1 if end[axis] > position[axis] else -1
+                previous = tuple(position)
+                position[axis] = end[axis]
+                length = abs(end[axis] - previous[axis])
+                if segments and segments[-1]["direction"] == direction:
+                    segments[-1]["to"] = tuple(position)
+                    segments[-1]["length"] += length
+                else:
+                    segments.append({"from": previous, "to": tuple(position), "direction": direction, "length": length})
         
         # Calculate safety score based on path characteristics
         # For example, paths with fewer vertical movements might be safer
-        vertical_movements = sum(1 for step in path 
-                               if step["from"][2] != step["to"][2])
-        path_length = len(path)
+        vertical_movements = sum(segment["length"] for segment in segments if segment["direction"][2])
+        path_length = sum(segment["length"] for segment in segments)
         safety_score = 1.0 if path_length == 0 else 1.0 - (vertical_movements / (path_length * 2))
         
         return RetrievalPath(
-            steps=path,
-            total_cost=final_node.g_cost,
-            priority_score=final_node.priority_bonus,
-            safety_score=max(0.1, min(1.0, safety_score))  # Ensure within 0.1-1.0 range
+            segments=segments,
+            total_cost=total_cost,
+            priority_score=self.calculate_priority_score(item_id),
+            safety_score=max(0.1, min(1.0, safety_score)),  # Ensure within 0.1-1.0 range
+            item_id=item_id,
+            step_cm=int(self.cell_cm) if self.cell_cm.is_integer() else self.cell_cm
         )
     
     # API endpoint handler method
     def handle_retrieve_request(self, request_data: Dict) -> Dict:
-        """Handle API endpoint requests to /api/retrieve"""
+        """
+        Handle API endpoint requests to /api/retrieve
+
+        Occupied space is given as occupiedBoxes, one entry per item: either
+        {"startCoordinates": {...}, "endCoordinates": {...}} (the Position
+        shape used elsewhere in the API) or [[x, y, z], [x, y, z]] corners in
+        cm. occupiedSpaces, a list of single [x, y, z] cells, is still read.
+
+        targetPositions (with an optional parallel itemIds list) instead of
+        targetPosition plans every target from one distance field and
+        returns "paths", with null for unreachable targets.
+
+        A single-target search stops after max_nodes expanded nodes or
+        max_seconds; "status" is then "budget_exhausted" and the path ends at
+        the point reached closest to the target. "nodesExpanded" reports the
+        search effort. Targets cut off from the start are answered as
+        "unreachable" by a flood fill before any search.
+
+        pathFormat picks the shape of each path: "segments" (default)
+        lists straight runs with direction and length in cm, "steps" the
+        older one-entry-per-cell list and "summary" only the costs and
+        scores.
+        """
         try:
             # Extract required parameters from request
             start_position = tuple(request_data.get("startPosition", (0, 0, 0)))
-            target_position = tuple(request_data.get("targetPosition"))
             item_id = request_data.get("item_id")
+            path_format = request_data.get("pathFormat", "segments")
+            if path_format not in PATH_FORMATS:
+                raise ValueError(f"Unknown pathFormat: {path_format}")
             
             # Update occupied spaces if provided
+            if "occupiedBoxes" in request_data:
+                self.occupied_boxes = []
+                for box in request_data["occupiedBoxes"]:
+                    self.add_occupied_box(*box_corners(box))
             if "occupiedSpaces" in request_data:
                 self.occupied_spaces = set(tuple(pos) for pos in request_data["occupiedSpaces"])
+                self._occupancy_version += 1
+            
+            if "targetPositions" in request_data:
+                targets = [tuple(position) for position in request_data["targetPositions"]]
+                item_ids = request_data.get("itemIds") or [item_id] * len(targets)
+                paths = self.find_retrieval_paths(start_position, list(zip(targets, item_ids)))
+                return {
+                    "success": any(path is not None for path in paths),
+                    "paths": [self._path_response(path, path_format) if path else None for path in paths],
+                    "memory": self.memory_report()
+                }
             
             # Find retrieval path
+            target_position = tuple(request_data.get("targetPosition"))
             path = self.find_retrieval_path(start_position, target_position, item_id)
             
+            search = self.last_search
             if path:
-                return {
-                    "success": True,
-                    "path": {
-                        "steps": path.steps,
-                        "totalCost": path.total_cost,
-                        "priorityScore": path.priority_score,
-                        "safetyScore": path.safety_score
-                    }
+                response = {
+                    "success": path.complete,
+                    "status": search.status,
+                    "path": self._path_response(path, path_format),
+                    "nodesExpanded": search.nodes_expanded,
+                    "memory": self.memory_report()
                 }
+                if not path.complete:
+                    response["error"] = "Search budget exhausted; path ends at the closest point reached"
+                return response
             else:
                 return {
                     "success": False,
+                    "status": search.status,
+                    "nodesExpanded": search.nodes_expanded,
                     "error": "No valid path found"
                 }
                 
@@ -325,4 +954,18 @@ class PriorityAStarRetrieval:
             return {
                 "success": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+    @staticmethod
+    def _path_response(path: RetrievalPath, path_format: str = "segments") -> Dict:
+        response = {
+            "totalCost": path.total_cost,
+            "priorityScore": path.priority_score,
+            "safetyScore": path.safety_score,
+            "complete": path.complete
+        }
+        if path_format == "segments":
+            response["segments"] = path.segments
+        elif path_format == "steps":
+            response["steps"] = path.steps()
+        return response
@@ -1,7 +1,13 @@
 from typing import Dict, List, Union, Optional, Tuple, Any
 from dataclasses import dataclass
-import re
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+import bisect
+import math
+import os
+import numpy as np
+
+# Retrieval plans kept by ItemSearchSystem, least recently used evicted first
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", "4096"))
 
 @dataclass
 class Coordinates:
@@ -14,25 +20,430 @@ class Position:
     startCoordinates: Coordinates
     endCoordinates: Coordinates
 
+def normalize_name(name: str) -> str:
+    return " ".join(str(name).lower().split())
+
+def name_trigrams(name: str) -> set:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    """
+    Normalized (case and whitespace insensitive) item names: a hash map for
+    exact lookups, a sorted array of names for prefix lookups and trigram
+    postings for typo-tolerant lookups.
+
+    Each distinct name gets an integer slot; the trigram postings are slot
+    arrays, so a fuzzy lookup counts shared trigrams with one bincount.
+    """
+
+    # Minimum trigram similarity (Dice coefficient) for a fuzzy match
+    FUZZY_THRESHOLD = 0.3
+
+    def __init__(self):
+        self.ids_by_name: Dict[str, List[str]] = {}
+        self.sorted_names: List[str] = []
+        self.slots: Dict[str, int] = {}
+        self.slot_names: List[Optional[str]] = []
+        self.slot_sizes = np.zeros(0, dtype=np.int32)
+        self.free_slots: List[int] = []
+        self.postings: Dict[str, set] = defaultdict(set)
+        self._posting_arrays: Dict[str, np.ndarray] = {}
+
+    def load(self, pairs: List[Tuple[str, str]]):
+        """
+        Index (item_id, name) pairs into an empty index in one go: the name
+        array is sorted once and the posting arrays are built up front.
+        """
+        slot_postings = defaultdict(list)
+        sizes = []
+        for item_id, name in pairs:
+            key = normalize_name(name)
+            if key not in self.ids_by_name:
+                self.ids_by_name[key] = []
+                slot = len(self.slot_names)
+                self.slots[key] = slot
+                self.slot_names.append(key)
+                trigrams = name_trigrams(key)
+                sizes.append(len(trigrams))
+                for trigram in trigrams:
+                    slot_postings[trigram].append(slot)
+            self.ids_by_name[key].append(item_id)
+        self.sorted_names = sorted(self.ids_by_name)
+        self.slot_sizes = np.array(sizes, dtype=np.int32)
+        for trigram, slots in slot_postings.items():
+            # Slots were handed out in increasing order, so every posting list is already sorted
+            self.postings[trigram] = set(slots)
+            self._posting_arrays[trigram] = np.array(slots, dtype=np.int64)
+
+    def _add_slot(self, key: str):
+        slot = self.free_slots.pop() if self.free_slots else len(self.slot_names)
+        if slot == len(self.slot_names):
+            self.slot_names.append(key)
+        else:
+            self.slot_names[slot] = key
+        if slot >= len(self.slot_sizes):
+            self.slot_sizes = np.concatenate([self.slot_sizes, np.zeros(max(slot + 1, 64, len(self.slot_sizes)), dtype=np.int32)])
+        trigrams = name_trigrams(key)
+        self.slot_sizes[slot] = len(trigrams)
+        self.slots[key] = slot
+        for trigram in trigrams:
+            self.postings[trigram].add(slot)
+            self._posting_arrays.pop(trigram, None)
+
+    def add(self, item_id: str, name: str):
+        key = normalize_name(name)
+        if key not in self.ids_by_name:
+            self.ids_by_name[key] = []
+            bisect.insort(self.sorted_names, key)
+            self._add_slot(key)
+        self.ids_by_name[key].append(item_id)
+
+    def remove(self, item_id: str, name: str):
+        key = normalize_name(name)
+        ids = self.ids_by_name.get(key)
+        if ids is None or item_id not in ids:
+            return
+        ids.remove(item_id)
+        if ids:
+            return
+        del self.ids_by_name[key]
+        del self.sorted_names[bisect.bisect_left(self.sorted_names, key)]
+        slot = self.slots.pop(key)
+        self.slot_names[slot] = None
+        self.slot_sizes[slot] = 0
+        self.free_slots.append(slot)
+        for trigram in name_trigrams(key):
+            self.postings[trigram].discard(slot)
+            self._posting_arrays.pop(trigram, None)
+            if not self.postings[trigram]:
+                del self.postings[trigram]
+
+    def exact(self, name: str) -> List[str]:
+        """Ids of every item with this name, in import order."""
+        return list(self.ids_by_name.get(normalize_name(name), []))
+
+    def prefix(self, prefix: str, limit: int) -> List[str]:
+        """Names starting with prefix, alphabetically."""
+        key = normalize_name(prefix)
+        start = bisect.bisect_left(self.sorted_names, key)
+        end = min(start + limit, len(self.sorted_names))
+        names = []
+        for i in range(start, end):
+            if not self.sorted_names[i].startswith(key):
+                break
+            names.append(self.sorted_names[i])
+        return names
+
+    def _posting_array(self, trigram: str) -> np.ndarray:
+        array = self._posting_arrays.get(trigram)
+        if array is None:
+            array = np.sort(np.fromiter(self.postings.get(trigram, ()), dtype=np.int64))
+            self._posting_arrays[trigram] = array
+        return array
+
+    def fuzzy(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Names most similar to query by shared trigrams, best first, with their score."""
+        query_trigrams = name_trigrams(normalize_name(query))
+        arrays = sorted((self._posting_array(trigram) for trigram in query_trigrams if trigram in self.postings), key=len)
+        # A name scoring >= FUZZY_THRESHOLD shares at least min_shared trigrams with the query, so it
+        # appears in one of the len(arrays) - min_shared + 1 rarest postings; the most common
+        # postings are then only probed for those candidates
+        min_shared = math.ceil(self.FUZZY_THRESHOLD * len(query_trigrams) / (2 - self.FUZZY_THRESHOLD))
+        probe = len(arrays) - max(min_shared, 1) + 1
+        if probe <= 0:
+            return []
+        # Sorting the candidate postings stays proportional to their size, unlike a bincount over every slot
+        slots, counts = np.unique(np.concatenate(arrays[:probe]), return_counts=True)
+        rest = arrays[probe:]
+        if len(slots) * 8 < sum(len(array) for array in rest):
+            for array in rest:
+                positions = np.minimum(np.searchsorted(array, slots), len(array) - 1)
+                counts += array[positions] == slots
+        else:
+            # Too many candidates to probe one by one; counting every posting is cheaper
+            counts = np.bincount(np.concatenate(arrays))[slots]
+        scores = 2 * counts / (len(query_trigrams) + self.slot_sizes[slots])
+        keep = scores >= self.FUZZY_THRESHOLD
+        slots, scores = slots[keep], scores[keep]
+        if len(slots) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            slots, scores = slots[best], scores[best]
+        matches = [(self.slot_names[slot], float(score)) for slot, score in zip(slots, scores)]
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def __len__(self) -> int:
+        return len(self.ids_by_name)
+
+class ContainerBoxes:
+    """
+    The items of one container and the "blocks" DAG between them.
+
+    Item b blocks item t when b starts in front of t (lower start depth),
+    their front-face projections (width x height rectangles) overlap and b
+    has the higher priority, so b has to come out before t can slide out.
+    Edges always point from front to back, so the graph is acyclic and
+    (start depth, item_id) is a topological order of it.
+
+    Boxes live in NumPy arrays indexed by slot, so the edges of one item are
+    found with a single mask; load() builds every edge at once with a
+    broadcasted pairwise comparison. add() and remove() update the edges of
+    one item and drop the cached ancestor lists of the items behind it.
+    """
+
+    # Bulk loads of larger containers build the edges one item at a time,
+    # since the pairwise matrix is items x items booleans
+    MATRIX_MAX_ITEMS = 4096
+
+    def __init__(self):
+        self.item_ids: List[Optional[str]] = []
+        self.slots: Dict[str, int] = {}
+        self.free_slots: List[int] = []
+        self.start = np.zeros((0, 3))
+        self.end = np.zeros((0, 3))
+        self.priority = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self.blocked_by: Dict[int, set] = {}
+        self.blocks: Dict[int, set] = {}
+        self._ancestors: Dict[int, List[str]] = {}
+
+    @classmethod
+    def load(cls, boxes: List[Tuple[str, List[float], List[float], int]]) -> "ContainerBoxes":
+        """Build from (item_id, start, end, priority) tuples, corners as [width, depth, height]."""
+        container = cls()
+        if not boxes:
+            return container
+        container.item_ids = [item_id for item_id, _, _, _ in boxes]
+        container.slots = {item_id: slot for slot, item_id in enumerate(container.item_ids)}
+        container.start = np.array([start for _, start, _, _ in boxes], dtype=np.float64)
+        container.end = np.array([end for _, _, end, _ in boxes], dtype=np.float64)
+        container.priority = np.array([priority for _, _, _, priority in boxes], dtype=np.int64)
+        container.active = np.ones(len(boxes), dtype=bool)
+        if len(boxes) <= cls.MATRIX_MAX_ITEMS:
+            # matrix[t, b]: b blocks t
+            start, end, priority = container.start, container.end, container.priority
+            matrix = cls._blocking(
+                start[:, None], end[:, None], priority[:, None],
+                start[None, :], end[None, :], priority[None, :]
+            )
+            targets, blockers = (side.tolist() for side in np.nonzero(matrix))
+        else:
+            targets, blockers = [], []
+            for slot in range(len(boxes)):
+                front = np.flatnonzero(container._in_front_of(slot)).tolist()
+                targets.extend([slot] * len(front))
+                blockers.extend(front)
+        container.blocked_by = {slot: set() for slot in range(len(boxes))}
+        container.blocks = {slot: set() for slot in range(len(boxes))}
+        for target, blocker in zip(targets, blockers):
+            container.blocked_by[target].add(blocker)
+            container.blocks[blocker].add(target)
+        return container
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.slots
+
+    @staticmethod
+    def _blocking(start: np.ndarray, end: np.ndarray, priority: np.ndarray,
+                  front_start: np.ndarray, front_end: np.ndarray, front_priority: np.ndarray) -> np.ndarray:
+        """Whether the front boxes block the target boxes, broadcast over the leading axes."""
+        return (
+            (front_start[..., 1] < start[..., 1]) &
+            (front_priority > priority) &
+            (front_end[..., 0] > start[..., 0]) & (front_start[..., 0] < end[..., 0]) &
+            (front_end[..., 2] > start[..., 2]) & (front_start[..., 2] < end[..., 2])
+        )
+
+    def _in_front_of(self, slot: int) -> np.ndarray:
+        """Mask of the slots blocking slot."""
+        return self.active & self._blocking(
+            self.start[slot], self.end[slot], self.priority[slot], self.start, self.end, self.priority
+        )
+
+    def _behind(self, slot: int) -> np.ndarray:
+        """Mask of the slots slot blocks."""
+        return self.active & self._blocking(
+            self.start, self.end, self.priority, self.start[slot], self.end[slot], self.priority[slot]
+        )
+
+    def _descendants(self, slot: int) -> set:
+        seen = set()
+        stack = [slot]
+        while stack:
+            for child in self.blocks[stack.pop()]:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return seen
+
+    def _forget(self, slots) -> None:
+        for slot in slots:
+            self._ancestors.pop(slot, None)
+
+    def add(self, item_id: str, start: List[float], end: List[float], priority: int) -> None:
+        """Add an item (or move it / change its priority, if already present)."""
+        if item_id in self.slots:
+            self.remove(item_id)
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.item_ids[slot] = item_id
+        else:
+            slot = len(self.item_ids)
+            self.item_ids.append(item_id)
+            if slot >= len(self.active):
+                capacity = max(8, 2 * len(self.active))
+                self.start = np.resize(self.start, (capacity, 3))
+                self.end = np.resize(self.end, (capacity, 3))
+                self.priority = np.resize(self.priority, capacity)
+                self.active = np.concatenate([self.active, np.zeros(capacity - len(self.active), dtype=bool)])
+        self.slots[item_id] = slot
+        self.start[slot] = start
+        self.end[slot] = end
+        self.priority[slot] = priority
+        self.active[slot] = False
+        self.blocked_by[slot] = set(np.flatnonzero(self._in_front_of(slot)).tolist())
+        self.blocks[slot] = set(np.flatnonzero(self._behind(slot)).tolist())
+        self.active[slot] = True
+        for parent in self.blocked_by[slot]:
+            self.blocks[parent].add(slot)
+        for child in self.blocks[slot]:
+            self.blocked_by[child].add(slot)
+        self._forget(self._descendants(slot))
+
+    def remove(self, item_id: str) -> None:
+        slot = self.slots.pop(item_id, None)
+        if slot is None:
+            return
+        self._forget(self._descendants(slot) | {slot})
+        for parent in self.blocked_by.pop(slot):
+            self.blocks[parent].discard(slot)
+        for child in self.blocks.pop(slot):
+            self.blocked_by[child].discard(slot)
+        self.active[slot] = False
+        self.item_ids[slot] = None
+        self.free_slots.append(slot)
+
+    def blockers(self, item_id: str) -> List[str]:
+        """
+        Every item that has to come out before item_id (its ancestors in the
+        DAG), front to back; cached until an item in front of it changes.
+        """
+        slot = self.slots[item_id]
+        ancestors = self._ancestors.get(slot)
+        if ancestors is None:
+            seen = set()
+            stack = [slot]
+            while stack:
+                for parent in self.blocked_by[stack.pop()]:
+                    if parent not in seen:
+                        seen.add(parent)
+                        stack.append(parent)
+            ancestors = [self.item_ids[parent] for parent in sorted(seen, key=lambda s: (self.start[s, 1], self.item_ids[s]))]
+            self._ancestors[slot] = ancestors
+        return ancestors
+
 class ItemSearchSystem:
-    def __init__(self, items_data: List[dict], containers_data: List[dict], cargo_data: List[dict]):
+    """
+    Search index over items, containers and the cargo arrangement, keyed by
+    item_id, with a name index and the set of items in each container.
+    Each container's blocker DAG (ContainerBoxes) is built on first search
+    and then kept up to date by place_item, remove_placement and priority
+    changes.
+
+    Every container has a version, bumped whenever an item is placed in,
+    moved out of or removed from it (retrieving the last use and undocking
+    go through remove_placement), or an item in it is updated. Retrieval
+    steps are cached in an LRU keyed on (item, container, version), so a
+    plan is reused until its container changes.
+
+    It is meant to live as long as the inventory: the replace_* methods
+    reload one table, the other update methods apply a single change.
+    """
+
+    def __init__(self, items_data: List[dict], containers_data: List[dict], cargo_data: List[dict],
+                 cache_size: int = RETRIEVAL_CACHE_SIZE):
         """Initialize with data from API endpoint"""
-        # Process items data
+        self.items_data: Dict[str, dict] = {}
+        self.name_index = NameIndex()
+        self.containers: Dict[str, dict] = {}
+        self.zone_containers: Dict[str, str] = {}
+        self.cargo_data: Dict[str, dict] = {}
+        self.container_items: Dict[str, set] = defaultdict(set)
+        self.container_boxes: Dict[str, ContainerBoxes] = {}
+        self.container_versions: Dict[str, int] = defaultdict(int)
+        self.cache_size = cache_size
+        self.steps_cache: "OrderedDict[Tuple[str, str, int], List[dict]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self.replace_items(items_data)
+        self.replace_containers(containers_data)
+        self.replace_cargo(cargo_data)
+
+    def replace_items(self, items_data: List[dict]):
         self.items_data = {}
         for item in items_data:
             item_id = str(item.get("item_id", ""))
             if item_id:
-                self.items_data[item_id] = {
-                    "name": item.get("name", ""),
-                    "width_cm": float(item.get("width_cm", 0)),
-                    "depth_cm": float(item.get("depth_cm", 0)),
-                    "height_cm": float(item.get("height_cm", 0)),
-                    "priority": int(item.get("priority", 1)),
-                    "usage_limit": int(item.get("usage_limit", 0))
-                }
-        
-        # Process containers data
+                self.items_data[item_id] = self._item_record(item)
+        self.steps_cache.clear()
+        # Priorities are part of the blocker DAGs
+        self.container_boxes.clear()
+        self.name_index = NameIndex()
+        self.name_index.load([(item_id, item["name"]) for item_id, item in self.items_data.items()])
+
+    def upsert_item(self, item: dict):
+        item_id = str(item.get("item_id", ""))
+        if not item_id:
+            return
+        self.remove_item(item_id)
+        self.items_data[item_id] = self._item_record(item)
+        self.name_index.add(item_id, self.items_data[item_id]["name"])
+        self._bump_item_container(item_id)
+        self._refresh_box(item_id)
+
+    @staticmethod
+    def _item_record(item: dict) -> dict:
+        return {
+            "name": item.get("name", ""),
+            "width_cm": float(item.get("width_cm", 0)),
+            "depth_cm": float(item.get("depth_cm", 0)),
+            "height_cm": float(item.get("height_cm", 0)),
+            "priority": int(item.get("priority", 1)),
+            "usage_limit": int(item.get("usage_limit", 0))
+        }
+
+    def remove_item(self, item_id: Union[int, str]):
+        item = self.items_data.pop(str(item_id), None)
+        if item is not None:
+            self.name_index.remove(str(item_id), item["name"])
+            self._bump_item_container(item_id)
+            self._refresh_box(str(item_id))
+
+    def _bump_item_container(self, item_id: Union[int, str]):
+        # Item names and priorities are part of the cached steps
+        placement = self.cargo_data.get(str(item_id))
+        if placement is not None:
+            self.container_versions[str(placement["container_id"])] += 1
+
+    def _refresh_box(self, item_id: str):
+        # Re-add a placed item to its container's DAG, its priority may have changed
+        placement = self.cargo_data.get(item_id)
+        if placement is not None and str(placement["container_id"]) in self.container_boxes:
+            start, end = self._corners(placement["position"])
+            self.container_boxes[str(placement["container_id"])].add(item_id, start, end, self._item_priority(item_id))
+
+    def set_usage_limit(self, item_id: Union[int, str], usage_limit: int):
+        if str(item_id) in self.items_data:
+            self.items_data[str(item_id)]["usage_limit"] = int(usage_limit)
+
+    def replace_containers(self, containers_data: List[dict]):
         self.containers = {}
+        self.zone_containers = {}
         for cont in containers_data:
             container_id = str(cont.get("container_id", ""))
             if container_id:
@@ -43,40 +454,58 @@ class ItemSearchSystem:
                     "depth_cm": float(cont.get("depth_cm", 0)),
                     "height_cm": float(cont.get("height_cm", 0))
                 }
+                # Searches report the first container of the item's zone
+                self.zone_containers.setdefault(self.containers[container_id]["zone"], container_id)
 
-        # Process cargo data with positions
+    def replace_cargo(self, cargo_data: List[dict]):
+        """Reload placements from cargo rows (typed start_/end_ position columns)."""
         self.cargo_data = {}
+        self.container_items = defaultdict(set)
+        self.container_boxes = {}
+        self.steps_cache.clear()
         for item in cargo_data:
             item_id = str(item.get("item_id", ""))
             if not item_id:
                 continue
-                
-            coords_str = item.get("coordinates", "")
-            if not coords_str:
-                continue
-                
-            # Extract coordinates using regex
-            coords = re.findall(r'[-+]?\d*\.\d+|[-+]?\d+', coords_str)
-            if len(coords) >= 6:
-                try:
-                    self.cargo_data[item_id] = {
-                        "zone": item.get("zone", ""),
-                        "container_id": item.get("container_id", ""),
-                        "position": {
-                            "startCoordinates": {
-                                "width_cm": float(coords[0]),
-                                "depth_cm": float(coords[1]),
-                                "height_cm": float(coords[2])
-                            },
-                            "endCoordinates": {
-                                "width_cm": float(coords[3]),
-                                "depth_cm": float(coords[4]),
-                                "height_cm": float(coords[5])
-                            }
-                        }
+
+            try:
+                self.place_item(item_id, item.get("zone", ""), item.get("container_id", ""), {
+                    "startCoordinates": {
+                        "width_cm": float(item["start_x_cm"]),
+                        "depth_cm": float(item["start_y_cm"]),
+                        "height_cm": float(item["start_z_cm"])
+                    },
+                    "endCoordinates": {
+                        "width_cm": float(item["end_x_cm"]),
+                        "depth_cm": float(item["end_y_cm"]),
+                        "height_cm": float(item["end_z_cm"])
                     }
-                except (ValueError, IndexError) as e:
-                    print(f"Error processing coordinates for item {item_id}: {e}")
+                })
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error processing coordinates for item {item_id}: {e}")
+
+    def place_item(self, item_id: Union[int, str], zone: str, container_id: str, position: dict):
+        """Place or move an item; position has startCoordinates/endCoordinates."""
+        item_id = str(item_id)
+        self.remove_placement(item_id)
+        self.cargo_data[item_id] = {
+            "zone": zone,
+            "container_id": container_id,
+            "position": position
+        }
+        self.container_items[str(container_id)].add(item_id)
+        self.container_versions[str(container_id)] += 1
+        if str(container_id) in self.container_boxes:
+            start, end = self._corners(position)
+            self.container_boxes[str(container_id)].add(item_id, start, end, self._item_priority(item_id))
+
+    def remove_placement(self, item_id: Union[int, str]):
+        placement = self.cargo_data.pop(str(item_id), None)
+        if placement is not None:
+            self.container_items[str(placement["container_id"])].discard(str(item_id))
+            self.container_versions[str(placement["container_id"])] += 1
+            if str(placement["container_id"]) in self.container_boxes:
+                self.container_boxes[str(placement["container_id"])].remove(str(item_id))
 
     def search_by_id(self, item_id: Union[int, str]) -> dict:
         """Search for item by ID and calculate optimal retrieval steps"""
@@ -101,10 +530,7 @@ class ItemSearchSystem:
         zone = cargo_info["zone"]
         
         # Find container for zone
-        container_id = next(
-            (cid for cid, cont in self.containers.items() if cont["zone"] == zone),
-            None
-        )
+        container_id = self.zone_containers.get(zone)
         
         if not container_id:
             return {
@@ -114,7 +540,7 @@ class ItemSearchSystem:
             }
 
         # Calculate retrieval steps
-        retrieval_steps = self._calculate_retrieval_steps(item_id, zone)
+        retrieval_steps = self._cached_retrieval_steps(item_id, zone)
 
         return {
             "success": True,
@@ -131,65 +557,127 @@ class ItemSearchSystem:
 
     def search_by_name(self, item_name: str) -> dict:
         """Search for item by name"""
-        for item_id, data in self.items_data.items():
-            if data["name"].lower() == item_name.lower():
-                return self.search_by_id(item_id)
-                
+        item_ids = self.name_index.exact(item_name)
+        if item_ids:
+            return self.search_by_id(item_ids[0])
+
         return {
             "success": True,
             "found": False,
             "message": f"Item with name '{item_name}' not found"
         }
 
+    def search_many(self, item_ids: List[Union[int, str]]) -> List[dict]:
+        """search_by_id for many items (blocker lists are shared through the container DAGs)."""
+        return [self.search_by_id(item_id) for item_id in item_ids]
+
+    def retrieval_steps(self, item_id: Union[int, str]) -> List[dict]:
+        """Retrieval steps of a placed item; empty if it is not placed."""
+        if str(item_id) not in self.cargo_data:
+            return []
+        return self._cached_retrieval_steps(str(item_id), self.cargo_data[str(item_id)]["zone"])
+
+    def _cached_retrieval_steps(self, item_id: str, zone: str) -> List[dict]:
+        container_id = str(self.cargo_data[item_id]["container_id"])
+        key = (item_id, container_id, self.container_versions[container_id])
+        steps = self.steps_cache.get(key)
+        if steps is not None:
+            self.cache_hits += 1
+            self.steps_cache.move_to_end(key)
+            return list(steps)
+        self.cache_misses += 1
+        steps = self._calculate_retrieval_steps(item_id, zone)
+        if self.cache_size > 0:
+            self.steps_cache[key] = steps
+            if len(self.steps_cache) > self.cache_size:
+                self.steps_cache.popitem(last=False)
+        return list(steps)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the retrieval steps cache."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            "size": len(self.steps_cache),
+            "capacity": self.cache_size
+        }
+
+    def suggest(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[dict]:
+        """
+        Items whose name matches query: every item with exactly that name,
+        then names starting with it, then (if fuzzy) the closest names by
+        trigram similarity, up to limit items.
+        """
+        matches = []
+        seen = set()
+
+        def add(names, match, scores=None):
+            for name in names:
+                for item_id in self.name_index.ids_by_name.get(name, []):
+                    if len(matches) >= limit:
+                        return
+                    if item_id in seen:
+                        continue
+                    seen.add(item_id)
+                    matches.append({
+                        "item_id": int(item_id),
+                        "name": self.items_data[item_id]["name"],
+                        "match": match,
+                        "score": round(scores[name], 3) if scores else 1.0
+                    })
+
+        key = normalize_name(query)
+        if not key:
+            return []
+        add([key] if key in self.name_index.ids_by_name else [], "exact")
+        add(self.name_index.prefix(key, limit), "prefix")
+        if fuzzy and len(matches) < limit:
+            scored = self.name_index.fuzzy(key, limit)
+            add([name for name, _ in scored], "fuzzy", dict(scored))
+        return matches
+
+    @staticmethod
+    def _corners(position: dict) -> Tuple[List[float], List[float]]:
+        return tuple(
+            [float(coords["width_cm"]), float(coords["depth_cm"]), float(coords["height_cm"])]
+            for coords in (position["startCoordinates"], position["endCoordinates"])
+        )
+
+    def _container_boxes(self, container_id: str) -> ContainerBoxes:
+        """Blocker DAG of a container, built from its items on first use."""
+        container_id = str(container_id)
+        boxes = self.container_boxes.get(container_id)
+        if boxes is None:
+            boxes = ContainerBoxes.load([
+                (item_id, *self._corners(self.cargo_data[item_id]["position"]), self._item_priority(item_id))
+                for item_id in self.container_items[container_id]
+            ])
+            self.container_boxes[container_id] = boxes
+        return boxes
+
+    def _item_name(self, item_id: str) -> str:
+        return self.items_data.get(item_id, {}).get("name", "")
+
+    def _item_priority(self, item_id: str) -> int:
+        return self.items_data.get(item_id, {}).get("priority", 1)
+
     def _calculate_retrieval_steps(self, target_item_id: str, zone: str) -> List[dict]:
         """Calculate optimal retrieval steps for an item using a dependency graph approach"""
         target_item_id = str(target_item_id)
-        target_item = self.cargo_data[target_item_id]
-        target_container = target_item["container_id"]
-        target_start = target_item["position"]["startCoordinates"]
-        target_end = target_item["position"]["endCoordinates"]
-        target_priority = self.items_data[target_item_id]["priority"]
-        
-        # Find all items in the same container
-        items_in_container = {
-            str(item_id): data for item_id, data in self.cargo_data.items()
-            if data["container_id"] == target_container and str(item_id) != target_item_id
-        }
-        
-        # Build dependency graph
-        blocking_items = []
-        
-        for item_id, item_data in items_in_container.items():
-            item_start = item_data["position"]["startCoordinates"]
-            item_end = item_data["position"]["endCoordinates"]
-            item_priority = self.items_data[item_id]["priority"]
-            
-            # Check if item is in front of target (blocking)
-            is_blocking = (
-                # Item is in front of target (starts at a lower depth)
-                item_start["depth_cm"] < target_start["depth_cm"] and
-                # Width overlap (items are side by side)
-                not (item_end["width_cm"] <= target_start["width_cm"] or 
-                     item_start["width_cm"] >= target_end["width_cm"]) and
-                # Priority check
-                item_priority > target_priority
-            )
-            
-            if is_blocking:
-                blocking_items.append({
-                    "item_id": item_id,
-                    "name": self.items_data[item_id]["name"],
-                    "position": item_data["position"],
-                    "priority": item_priority
-                })
+        boxes = self._container_boxes(self.cargo_data[target_item_id]["container_id"])
+
+        # Everything that blocks the target, directly or by blocking a blocker (front to back)
+        blocking_items = [
+            {"item_id": item_id, "name": self._item_name(item_id)}
+            for item_id in boxes.blockers(target_item_id)
+        ]
         
         # If no blocking items, return empty list (0 steps needed)
         if not blocking_items:
             return []
         
-        # Sort blocking items by depth (front to back)
-        blocking_items.sort(key=lambda x: x["position"]["startCoordinates"]["depth_cm"])
-        
         # Generate retrieval steps
         steps = []
         step_number = 1
@@ -209,7 +697,7 @@ class ItemSearchSystem:
             "step": step_number,
             "action": "retrieve",
             "item_id": int(target_item_id),
-            "item_name": self.items_data[target_item_id]["name"]
+            "item_name": self._item_name(target_item_id)
         })
         step_number += 1
         
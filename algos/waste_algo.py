@@ -2,6 +2,8 @@ from typing import List, Dict, Tuple, Optional
 from datetime import datetime
 import polars as pl
 import json
+from storage.inventory_store import inventory_store
+from storage.snapshot import read_snapshot
 
 def load_waste_items(filename: Optional[str] = None) -> List[Dict]:
     """
@@ -15,29 +17,25 @@ def load_waste_items(filename: Optional[str] = None) -> List[Dict]:
     """
     try:
         file_to_load = filename or "waste_items.csv"
-        waste_items_df = pl.read_csv(file_to_load)
+        waste_items_df = read_snapshot(file_to_load)
+        if waste_items_df is None:
+            return []
         return waste_items_df.to_dicts()
     except Exception as e:
         print(f"Error loading waste items: {str(e)}")
         return []
 
-def load_imported_items(filename: Optional[str] = None) -> Dict[str, Dict]:
+def load_imported_items() -> Dict[str, Dict]:
     """
-    Load imported items from CSV file.
+    Imported items, served from the shared inventory store.
     
-    Args:
-        filename: Optional path to the imported items CSV file. Defaults to "imported_items.csv".
-        
     Returns:
         Dictionary mapping item_id to item properties
     """
-    try:
-        file_to_load = filename or "imported_items.csv"
-        imported_items_df = pl.read_csv(file_to_load)
-        return {str(item["item_id"]): item for item in imported_items_df.to_dicts()}
-    except Exception as e:
-        print(f"Error loading imported items: {str(e)}")
+    items_df = inventory_store.items()
+    if items_df is None:
         return {}
+    return {str(item["item_id"]): item for item in items_df.to_dicts()}
 
 def link_waste_with_imported_items(waste_items: List[Dict], imported_items: Dict[str, Dict]) -> List[Dict]:
     """
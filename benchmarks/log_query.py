@@ -0,0 +1,64 @@
+"""
+Time a one-day GET /api/logs style query as the log history grows, to check
+that it depends on the window (one daily segment) rather than on the history.
+
+    python benchmarks/log_query.py [events_per_day] [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage.log_sink import DETAIL_COLUMNS, LOG_SCHEMA, LogSink
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def write_days(sink: LogSink, first_day: int, days: int, events_per_day: int) -> None:
+    rng = np.random.default_rng(first_day)
+    for day in range(first_day, first_day + days):
+        first_id = day * events_per_day + 1
+        offsets = np.sort(rng.integers(0, 86_400_000_000, events_per_day))
+        base = START + timedelta(days=day)
+        sink._append(pl.DataFrame({
+            "log_id": np.arange(first_id, first_id + events_per_day),
+            "timestamp": [(base + timedelta(microseconds=int(us))).isoformat() for us in offsets],
+            "user_id": [f"u{n}" for n in rng.integers(0, 50, events_per_day)],
+            "action_type": rng.choice(["placement", "retrieval", "search", "disposal"], events_per_day),
+            "item_id": rng.integers(1, 10_000, events_per_day),
+            **{column: [None] * events_per_day for column in DETAIL_COLUMNS},
+        }, schema=LOG_SCHEMA))
+
+
+def best_of(repeats: int, query) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        query()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    events_per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as work:
+        sink = LogSink(os.path.join(work, "logs"), legacy_file=None)
+        window = (START + timedelta(days=3), START + timedelta(days=3, hours=23))
+        written = 0
+        print(f"{events_per_day} events/day, one-day window, best of {repeats}")
+        for days in (7, 30, 90):
+            write_days(sink, written, days - written, events_per_day)
+            written = days
+            rows = sink.scan(*window, user_id="u7").collect().height
+            elapsed = best_of(repeats, lambda: sink.scan(*window, user_id="u7").collect())
+            print(f"  {days:3d} days of history: {elapsed * 1000:7.1f} ms ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Latency of exact, prefix and fuzzy name lookups (ItemSearchSystem.suggest)
+on a large synthetic inventory.
+
+    python benchmarks/name_search.py [items] [queries]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algos.search_algo import ItemSearchSystem
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def make_items(count: int, rng: random.Random):
+    # A vocabulary of a few thousand made-up words, three per name
+    words = list({"".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 9))) for _ in range(5_000)})
+    return [{"item_id": i, "name": " ".join(rng.sample(words, 3))} for i in range(1, count + 1)]
+
+
+def typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + name[i + 1:]
+
+
+def time_queries(label: str, queries, lookup) -> None:
+    start = time.perf_counter()
+    for query in queries:
+        lookup(query)
+    elapsed = (time.perf_counter() - start) / len(queries)
+    print(f"  {label:7s} {elapsed * 1e6:8.1f} us/query")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    rng = random.Random(0)
+    items = make_items(count, rng)
+
+    start = time.perf_counter()
+    search = ItemSearchSystem(items, [], [])
+    print(f"{count} items, {len(search.name_index)} distinct names, index built in {time.perf_counter() - start:.2f} s")
+
+    names = [rng.choice(items)["name"] for _ in range(query_count)]
+    time_queries("exact", names, lambda q: search.suggest(q, fuzzy=False))
+    time_queries("prefix", [name[:6] for name in names], lambda q: search.suggest(q, fuzzy=False))
+    time_queries("fuzzy", [typo(name, rng) for name in names], lambda q: search.suggest(q))
+
+
+if __name__ == "__main__":
+    main()
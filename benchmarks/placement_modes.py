@@ -0,0 +1,56 @@
+"""
+Compare the placement modes of AdvancedCargoPlacement on one container:
+items placed, volume filled, fit tests per item and runtime of the
+direct-fit search (the rearrangement fallback is left out, it is the same
+lattice scan in every mode). For the height map every footprint of the
+vectorized pass counts as a probe.
+
+    python benchmarks/placement_modes.py [items] [container_cm] [modes...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algos.placement_algo import AdvancedCargoPlacement, ItemDimensions
+
+
+def make_items(count: int, rng: random.Random):
+    items = [
+        ItemDimensions(rng.randint(5, 40), rng.randint(5, 40), rng.randint(5, 40), rng.randint(1, 100), item_id)
+        for item_id in range(1, count + 1)
+    ]
+    # Same order as find_optimal_placement: priority, then volume, descending
+    return sorted(items, key=lambda item: (-item.priority, -item.width_cm * item.depth_cm * item.height_cm))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    modes = sys.argv[3:] or ["grid", "extreme_points", "heightmap"]
+    items = make_items(count, random.Random(0))
+    dims = {"width_cm": size, "depth_cm": size, "height_cm": 2 * size}
+    volume = size * size * 2 * size
+
+    print(f"{count} items into a {size}x{size}x{2 * size} cm container")
+    for mode in modes:
+        # Without a container_id every placer starts from an empty container
+        placer = AdvancedCargoPlacement(dims, mode=mode)
+        placed = filled = 0
+        start = time.perf_counter()
+        for item in items:
+            for rotated, _ in placer.get_90degree_rotations(item):
+                pos = placer._find_free_position(rotated)
+                if pos is not None:
+                    placer._place_item(pos, rotated)
+                    placed += 1
+                    filled += rotated.width_cm * rotated.depth_cm * rotated.height_cm
+                    break
+        elapsed = time.perf_counter() - start
+        print(f"  {mode:15s} {placed:4d} placed, {filled / volume:6.1%} filled, "
+              f"{placer.probes / count:8.1f} probes/item, {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Time the blocker DAG behind retrieval steps for one crowded container:
+building it, retrieval steps for every item (cold, then from the cached
+ancestor lists) and moving single items.
+
+    python benchmarks/retrieval_blockers.py [items_per_container] [moves]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algos.search_algo import ItemSearchSystem
+
+
+def random_box(rng: random.Random):
+    start = [rng.randrange(190) for _ in range(3)]
+    return start, [value + rng.randint(2, 10) for value in start]
+
+
+def position(start, end) -> dict:
+    axes = ("width_cm", "depth_cm", "height_cm")
+    return {"startCoordinates": dict(zip(axes, start)), "endCoordinates": dict(zip(axes, end))}
+
+
+def make_inventory(count: int, rng: random.Random):
+    items, cargo = [], []
+    for item_id in range(1, count + 1):
+        start, end = random_box(rng)
+        items.append({"item_id": item_id, "name": f"item {item_id}", "priority": rng.randint(1, 100)})
+        cargo.append({
+            "item_id": item_id, "zone": "Storage", "container_id": "contA",
+            "start_x_cm": start[0], "start_y_cm": start[1], "start_z_cm": start[2],
+            "end_x_cm": end[0], "end_y_cm": end[1], "end_z_cm": end[2],
+        })
+    containers = [{"container_id": "contA", "zone": "Storage", "width_cm": 200, "depth_cm": 200, "height_cm": 200}]
+    return items, containers, cargo
+
+
+def timed(label: str, run, per: int = 1) -> None:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:28s} {elapsed * 1000:8.1f} ms" + (f" ({elapsed / per * 1e6:.1f} us each)" if per > 1 else ""))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    moves = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(0)
+    items, containers, cargo = make_inventory(count, rng)
+    item_ids = [str(item["item_id"]) for item in items]
+    search = ItemSearchSystem(items, containers, cargo)
+
+    print(f"{count} items in one container")
+    timed("build DAG", lambda: search._container_boxes("contA"))
+    timed("steps for every item (cold)", lambda: [search.retrieval_steps(item_id) for item_id in item_ids], count)
+    timed("steps for every item (warm)", lambda: [search.retrieval_steps(item_id) for item_id in item_ids], count)
+
+    def move_and_search():
+        for _ in range(moves):
+            item_id = rng.choice(item_ids)
+            search.place_item(item_id, "Storage", "contA", position(*random_box(rng)))
+            search.retrieval_steps(rng.choice(item_ids))
+    timed(f"{moves} moves + searches", move_and_search, moves)
+
+
+if __name__ == "__main__":
+    main()
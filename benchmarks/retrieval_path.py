@@ -0,0 +1,82 @@
+"""
+Time PriorityAStarRetrieval.find_retrieval_path in a full-size container
+packed with item boxes, from the opening to cells behind the items, then
+the same targets answered from one distance field, then one target cut off
+from the opening (answered by the connectivity precheck).
+
+    python benchmarks/retrieval_path.py [container_cm] [item_cm] [queries] [backend] [cell_cm]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algos.retrieve_algo import PriorityAStarRetrieval
+
+
+def pack(retriever: PriorityAStarRetrieval, size: int, item: int, rng: random.Random) -> int:
+    """Fill the container with item-sized boxes on a grid with 2 cm aisles, leaving some slots empty."""
+    count = 0
+    pitch = item + 2
+    for x in range(2, size - item + 1, pitch):
+        for y in range(2, size - item + 1, pitch):
+            for z in range(2, size - item + 1, pitch):
+                if rng.random() < 0.8:
+                    retriever.add_occupied_box((x, y, z), (x + item, y + item, z + item))
+                    count += 1
+    return count
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    item = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    queries = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    backend = sys.argv[4] if len(sys.argv) > 4 else "graph"
+    cell_cm = float(sys.argv[5]) if len(sys.argv) > 5 else 1.0
+    rng = random.Random(0)
+    retriever = PriorityAStarRetrieval({"width_cm": size, "depth_cm": size, "height_cm": size}, backend=backend, cell_cm=cell_cm)
+    count = pack(retriever, size, item, rng)
+
+    targets = []
+    while len(targets) < queries:
+        target = (rng.randrange(size), rng.randrange(size), rng.randrange(size))
+        if not retriever.is_occupied(target):
+            targets.append(target)
+
+    found = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for target in targets:
+            found += retriever.find_retrieval_path((0, 0, 0), target, "1") is not None
+    elapsed = (time.perf_counter() - start) / queries
+    print(f"{size} cm container, {count} items of {item} cm, {backend} backend: "
+          f"{elapsed * 1000:.1f} ms/path ({found}/{queries} reachable), {retriever.memory_bytes} bytes")
+
+    # All targets from one distance field (cell_cm applies here too)
+    for label in ("cold", "cached"):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            paths = retriever.find_retrieval_paths((0, 0, 0), [(target, "1") for target in targets])
+        elapsed = time.perf_counter() - start
+        print(f"  distance field, {label}: {elapsed * 1000:.1f} ms for {queries} targets "
+              f"({sum(path is not None for path in paths)} reachable), {retriever.memory_bytes} bytes")
+
+    # Seal the far corner off behind a wall one cell thick
+    corner = size - item
+    for axis in range(3):
+        low, high = [corner] * 3, [size] * 3
+        high[axis] = corner + 1
+        retriever.add_occupied_box(tuple(low), tuple(high))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = retriever.find_retrieval_path((0, 0, 0), (size - 1, size - 1, size - 1), "1")
+    elapsed = time.perf_counter() - start
+    print(f"  sealed-off target: {elapsed * 1000:.1f} ms, {retriever.last_search.status}, "
+          f"{retriever.last_search.nodes_expanded} nodes expanded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare cold load time of a large items table from CSV (pl.read_csv) and from
+an Arrow IPC snapshot (storage.snapshot.read_snapshot).
+
+    python benchmarks/snapshot_load.py [rows] [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage.snapshot import ipc_path, read_snapshot, write_snapshot
+
+
+def make_items(rows: int) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    return pl.DataFrame({
+        "item_id": np.arange(1, rows + 1),
+        "name": [f"Item {i}" for i in range(rows)],
+        "width_cm": rng.integers(5, 100, rows),
+        "depth_cm": rng.integers(5, 100, rows),
+        "height_cm": rng.integers(5, 100, rows),
+        "mass_kg": rng.uniform(0.1, 50, rows).round(2),
+        "priority": rng.integers(1, 101, rows),
+        "expiry_date": np.where(rng.random(rows) < 0.5, "N/A", "2030-05-20"),
+        "usage_limit": rng.integers(1, 100, rows),
+        "preferred_zone": rng.choice(["Crew Quarters", "Airlock", "Medical Bay", "Storage Bay"], rows),
+    })
+
+
+def best_of(repeats: int, load) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = load()
+        timings.append(time.perf_counter() - start)
+        assert df is not None and df.height > 0
+    return min(timings)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    items = make_items(rows)
+
+    with tempfile.TemporaryDirectory() as work:
+        csv_file = os.path.join(work, "imported_items.csv")
+        items.write_csv(csv_file)
+        write_snapshot(items, csv_file, snapshot_format="ipc")
+
+        print(f"{rows} rows, best of {repeats}")
+        print(f"  csv size: {os.path.getsize(csv_file) / 1e6:.1f} MB, "
+              f"ipc size: {os.path.getsize(ipc_path(csv_file)) / 1e6:.1f} MB")
+        csv_time = best_of(repeats, lambda: pl.read_csv(csv_file))
+        ipc_time = best_of(repeats, lambda: read_snapshot(csv_file))
+        print(f"  pl.read_csv:        {csv_time * 1000:8.1f} ms")
+        print(f"  ipc (memory map):   {ipc_time * 1000:8.1f} ms")
+        print(f"  speedup:            {csv_time / ipc_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
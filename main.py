@@ -1,10 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routers import import_export, placement, search_retrieve, waste, time_simulation, logs
+from storage.inventory_store import inventory_store
+from storage.log_sink import log_sink
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse the inventory tables once; requests are served from memory afterwards
+    inventory_store.load()
+    log_sink.start()
+    yield
+    # Fold the mutation journal back into the CSV snapshots
+    inventory_store.compact()
+    # Append the log events still queued
+    log_sink.stop()
+
 
 app = FastAPI(
     title="Cargo Management API",
     description="API for managing cargo placement, retrieval, waste, and time simulation.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(import_export.router)
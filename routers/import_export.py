@@ -4,6 +4,9 @@ import polars as pl
 from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException, UploadFile, File, Response
 from schemas import CargoPlacementSystem, ImportItemsResponse, ImportContainersResponse, CargoArrangementExport, Coordinates
+from storage.inventory_store import inventory_store
+from storage.log_sink import log_sink
+from storage.positions import CARGO_SCHEMA, coordinates_expr
 import polars as pl
 import json
 import os
@@ -15,22 +18,7 @@ router = APIRouter(
 
 cargo_system = CargoPlacementSystem()
 
-LOG_FILE = "logs.csv"
-
-# DataFrame to store logs
-log_columns = ["timestamp", "user_id", "action_type", "item_id", "details"]
-logs_df = pl.DataFrame(schema={
-    "timestamp": pl.Utf8,
-    "user_id": pl.Utf8,
-    "action_type": pl.Utf8,
-    "item_id": pl.Int64, # TO integer
-    "details": pl.Utf8  # Store details as a string (JSON)
-})
-
-
 def log_action(action_type: str, details: dict = None, user_id: str = "", item_id: int = 0):
-    global logs_df
-
     if not isinstance(details, dict):  # Ensure details is a dictionary
         details = {"from_container": "", "to_container": "", "reason": str(details)}
 
@@ -40,20 +28,7 @@ def log_action(action_type: str, details: dict = None, user_id: str = "", item_i
         "reason": details.get("reason", "")
     }
 
-    details_json = json.dumps(structured_details)  # Store as JSON string
-
-    new_entry = pl.DataFrame(
-        {
-            "timestamp": [datetime.now(timezone.utc).isoformat()],
-            "user_id": [user_id],
-            "action_type": [action_type],
-            "item_id": [item_id],
-            "details": [details_json],  # Ensure JSON format
-        }
-    )
-
-    logs_df = pl.concat([logs_df, new_entry], how="vertical")
-    logs_df.write_csv(LOG_FILE)
+    log_sink.emit(user_id, action_type, item_id, structured_details)
 
 def convert_csv_to_json(file_contents: str):
     """ Convert CSV data to a list of dictionaries (JSON format). """
@@ -147,7 +122,7 @@ async def import_items(file: UploadFile = File(...)):
             
             # Create imported_items.csv file
             items_df = pl.DataFrame(items)
-            items_df.write_csv("imported_items.csv")
+            inventory_store.replace_items(items_df)
             
         except Exception as e:
             log_action("Import Items Failed", f"Error: {str(e)}")
@@ -211,7 +186,7 @@ async def import_containers(file: UploadFile = File(...)):
             
             # Create imported_containers.csv file
             containers_df = pl.DataFrame(containers)
-            containers_df.write_csv("imported_containers.csv")
+            inventory_store.replace_containers(containers_df)
             
         except Exception as e:
             log_action("Import Containers Failed", f"Error: {str(e)}")
@@ -233,8 +208,8 @@ async def export_arrangement():
         # If cargo_system is empty, try to load from CSV files directly
         if cargo_system.items_df.is_empty():
             print("Cargo system items are empty. Attempting to load from CSV files...")
-            if os.path.exists("imported_items.csv"):
-                items_df = pl.read_csv("imported_items.csv")
+            items_df = inventory_store.items()
+            if items_df is not None:
                 if not items_df.is_empty():
                     print(f"Loaded {len(items_df)} items from imported_items.csv")
                     cargo_system.items_df = items_df
@@ -247,8 +222,8 @@ async def export_arrangement():
             
         if cargo_system.containers_df.is_empty():
             print("Cargo system containers are empty. Attempting to load from CSV files...")
-            if os.path.exists("imported_containers.csv"):
-                containers_df = pl.read_csv("imported_containers.csv")
+            containers_df = inventory_store.containers()
+            if containers_df is not None:
                 if not containers_df.is_empty():
                     print(f"Loaded {len(containers_df)} containers from imported_containers.csv")
                     cargo_system.containers_df = containers_df
@@ -347,32 +322,18 @@ async def export_arrangement():
         
         # Create and save the cargo_arrangement.csv file
         arrangement_csv_path = "cargo_arrangement.csv"
-        temp_arrangement_csv_path = "temp_cargo_arrangement.csv"
-        
-        with open(arrangement_csv_path, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["item_id", "zone", "container_id", "coordinates"])
-            
-            for placement in placements:
-                writer.writerow([
-                    placement["item_id"],
-                    placement["zone"],
-                    placement["container_id"],
-                    f"({round(placement['start_x_cm'], 2)},{round(placement['start_y_cm'], 2)},{round(placement['start_z_cm'], 2)}),"
-                    f"({round(placement['end_x_cm'], 2)},{round(placement['end_y_cm'], 2)},{round(placement['end_z_cm'], 2)})"
-                ])
-        with open(temp_arrangement_csv_path, 'w', newline='') as csvfile:
-            writert = csv.writer(csvfile)
-            writert.writerow(["item_id", "zone", "container_id", "coordinates"])
-            
-            for placement in placements:
-                writert.writerow([
-                    placement["item_id"],
-                    placement["zone"],
-                    placement["container_id"],
-                    f"({round(placement['start_x_cm'], 2)},{round(placement['start_y_cm'], 2)},{round(placement['start_z_cm'], 2)}),"
-                    f"({round(placement['end_x_cm'], 2)},{round(placement['end_y_cm'], 2)},{round(placement['end_z_cm'], 2)})"
-                ])
+        arrangement_df = pl.DataFrame({
+            "item_id": [placement["item_id"] for placement in placements],
+            "zone": [placement["zone"] for placement in placements],
+            "container_id": [str(placement["container_id"]) for placement in placements],
+            "start_x_cm": [placement["start_x_cm"] for placement in placements],
+            "start_y_cm": [placement["start_y_cm"] for placement in placements],
+            "start_z_cm": [placement["start_z_cm"] for placement in placements],
+            "end_x_cm": [placement["end_x_cm"] for placement in placements],
+            "end_y_cm": [placement["end_y_cm"] for placement in placements],
+            "end_z_cm": [placement["end_z_cm"] for placement in placements]
+        }, schema=CARGO_SCHEMA)
+        inventory_store.replace_cargo(arrangement_df)
         
         print(f"Wrote {len(placements)} placements to {arrangement_csv_path}")
         
@@ -387,24 +348,14 @@ async def export_arrangement():
                 else:
                     print(f"Container {container['container_id']}: Full")
         
-        # Prepare the response
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["item_id", "zone", "container_id", "coordinates"])
-        
-        with open(arrangement_csv_path, 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Skip header
-            for row in reader:
-                writer.writerow(row)
-                
-        output.seek(0)
+        # Prepare the response; the exported CSV keeps the "(x,y,z),(x,y,z)" coordinates format
+        output = arrangement_df.select("item_id", "zone", "container_id", coordinates_expr()).write_csv()
         
         print("=== Export Process Complete ===")
         log_action("Export Arrangement", f"Exported {len(placements)} placements successfully")
 
         return Response(
-            output.getvalue(), 
+            output, 
             media_type="text/csv", 
             headers={
                 "Content-Disposition": "attachment; filename=cargo_arrangement.csv"
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from fastapi.responses import StreamingResponse
 import polars as pl
 import os
 import re
@@ -17,6 +18,8 @@ from datetime import datetime, timezone, timedelta
 import csv
 from algos.retrieve_algo import PriorityAStarRetrieval
 from algos.search_algo import ItemSearchSystem
+from storage.inventory_store import inventory_store
+from storage.log_sink import LOG_OUTPUT, log_sink
 import numpy as np
 import pandas as pd
 import json
@@ -30,22 +33,6 @@ cargo_file = "cargo_arrangement.csv"
 items_file = "imported_items.csv"
 containers_file = "imported_containers.csv"
 
-LOG_FILE = "logs.csv"
-
-# Initialize logs dataframe with proper schema
-logs_df = pl.DataFrame(schema={
-    "timestamp": pl.Utf8,
-    "user_id": pl.Utf8,
-    "action_type": pl.Utf8,
-    "item_id": pl.Int64,
-    "details": pl.Utf8
-})
-
-# Create logs file if it doesn't exist
-if not os.path.exists(LOG_FILE):
-    # Create an empty DataFrame with the correct schema
-    logs_df.write_csv(LOG_FILE)
-
 def log_action(user_id: str, action_type: str, item_id: int = None, details: dict = None):
     """
     Log an action to the system log
@@ -56,32 +43,13 @@ def log_action(user_id: str, action_type: str, item_id: int = None, details: dic
     - item_id: Optional ID of the item affected
     - details: Optional dictionary of additional details
     """
-    global logs_df
-    
-    # Create timestamp in UTC
-    timestamp = datetime.now(timezone.utc).isoformat()
-    
-    # Convert details to JSON string
-    details_json = json.dumps(details) if details else "{}"
-    
-    # Create new log entry
-    new_log = pl.DataFrame({
-        "timestamp": [timestamp],
-        "user_id": [str(user_id)],
-        "action_type": [action_type],
-        "item_id": [item_id],
-        "details": [details_json]
-    })
-    
-    # Load existing logs and append new log
-    if os.path.exists(LOG_FILE):
-        existing_logs = pl.read_csv(LOG_FILE)
-        logs_df = pl.concat([existing_logs, new_log])
-    else:
-        logs_df = new_log
-    
-    # Save to CSV
-    logs_df.write_csv(LOG_FILE)
+    # Queued and appended in batches by the log sink
+    log_sink.emit(user_id, action_type, item_id, details)
+
+def to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
 
 @router.get("")
 async def get_logs(
@@ -89,106 +57,74 @@ async def get_logs(
     endDate: str = Query(..., description="End date in ISO format (YYYY-MM-DDTHH:MM:SSZ)"),
     item_id: int = Query(None, description="Optional Item ID filter"),
     user_id: str = Query(None, description="Optional User ID filter"),
-    action_type: str = Query(None, description='Optional action type: "placement", "retrieval", "rearrangement", "disposal"')
+    action_type: str = Query(None, description='Optional action type: "placement", "retrieval", "rearrangement", "disposal"'),
+    limit: Optional[int] = Query(None, ge=1, description="Optional maximum number of logs to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (or the last log_id seen)"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description='"json", or "ndjson" to stream one log per line')
 ):
-    global logs_df
-    
+    try:
+        after_log_id = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
     try:
         # Convert Z to +00:00 for proper ISO format
         startDate = startDate.replace('Z', '+00:00')
         endDate = endDate.replace('Z', '+00:00')
         
-        print(f"Getting logs with filters: startDate={startDate}, endDate={endDate}, item_id={item_id}, user_id={user_id}, action_type={action_type}")
+        print(f"Getting logs with filters: startDate={startDate}, endDate={endDate}, item_id={item_id}, user_id={user_id}, action_type={action_type}, limit={limit}, cursor={cursor}")
         
-        # Load logs from file
-        if os.path.exists(LOG_FILE):
-            print(f"Reading logs from {LOG_FILE}")
-            logs_df = pl.read_csv(LOG_FILE)
-            print(f"Total logs found: {len(logs_df)}")
-            
-            # Convert timestamps
-            start_date = datetime.fromisoformat(startDate).replace(tzinfo=timezone.utc)
-            end_date = datetime.fromisoformat(endDate).replace(tzinfo=timezone.utc)
-            print(f"Date range: {start_date} to {end_date}")
-            
-            # Convert timestamp strings to datetime objects
-            logs_df = logs_df.with_columns(
-                pl.col("timestamp").str.strptime(pl.Datetime).dt.convert_time_zone("UTC")
-            )
-            
-            # Ensure item_id column is of type Int64 and handle null values
-            logs_df = logs_df.with_columns(
-                pl.col("item_id").cast(pl.Int64, strict=False)
+        # Convert timestamps (dates without an offset are taken as UTC)
+        start_date = to_utc(datetime.fromisoformat(startDate))
+        end_date = to_utc(datetime.fromisoformat(endDate))
+        print(f"Date range: {start_date} to {end_date}")
+
+        filters = dict(item_id=item_id, user_id=user_id, action_type=action_type, after_log_id=after_log_id)
+
+        if format == "ndjson":
+            # Each daily segment is collected and sent on its own; the log_id of the last line is the next cursor
+            segments = log_sink.iter_segments(start_date, end_date, limit=limit, **filters)
+            return StreamingResponse(
+                (df.select(LOG_OUTPUT).write_ndjson() for df in segments),
+                media_type="application/x-ndjson"
             )
-            
-            # Apply filters
-            filter_conditions = (pl.col("timestamp") >= start_date) & (pl.col("timestamp") <= end_date)
-            
-            if item_id is not None:
-                print(f"Filtering by item_id: {item_id}")
-                # Convert item_id to Int64 for comparison
-                filter_conditions = filter_conditions & (pl.col("item_id") == pl.lit(item_id, dtype=pl.Int64))
-            
-            if user_id is not None:
-                print(f"Filtering by user_id: {user_id}")
-                filter_conditions = filter_conditions & (pl.col("user_id") == user_id)
-            
-            if action_type is not None:
-                print(f"Filtering by action_type: {action_type}")
-                filter_conditions = filter_conditions & (pl.col("action_type") == action_type)
-            
-            # Apply filters
-            filtered_logs = logs_df.filter(filter_conditions)
-            print(f"Logs after filtering: {len(filtered_logs)}")
-            
-            # Convert to list of dictionaries
-            logs_list = filtered_logs.to_dicts()
-            
-            # Parse JSON details
-            for log in logs_list:
-                try:
-                    log["details"] = json.loads(log["details"])
-                except:
-                    log["details"] = {}
-            
-            return {"logs": logs_list}
-        
-        print(f"Log file {LOG_FILE} not found")
-        return {"logs": []}
+
+        # Only the daily segments in range are opened; the filters run inside the CSV scan
+        logs_scan = log_sink.scan(start_date, end_date, **filters)
+        if logs_scan is None:
+            print(f"No log segments between {start_date.date()} and {end_date.date()}")
+            return {"logs": [], "next_cursor": None}
+
+        if limit is not None:
+            logs_scan = logs_scan.head(limit)
+        filtered_logs = logs_scan.select(LOG_OUTPUT).collect()
+        print(f"Logs after filtering: {len(filtered_logs)}")
+
+        next_cursor = None
+        if limit is not None and len(filtered_logs) == limit:
+            next_cursor = str(filtered_logs["log_id"][-1])
+
+        # Serialized by polars; details are already structured columns
+        return Response(
+            content=f'{{"logs":{filtered_logs.write_json()},"next_cursor":{json.dumps(next_cursor)}}}',
+            media_type="application/json"
+        )
         
     except Exception as e:
         print(f"Error processing logs: {str(e)}")
         import traceback
         print(traceback.format_exc())
-        return {"logs": []}
+        return {"logs": [], "next_cursor": None}
 
 @router.post("/clear")
 async def clear_logs():
     """Clear all logs and delete imported files."""
     try:
-        # Delete the log file
-        if os.path.exists(LOG_FILE):
-            os.remove(LOG_FILE)
-            # Reinitialize empty logs DataFrame
-            logs_df = pl.DataFrame(schema={
-                "timestamp": pl.Utf8,
-                "user_id": pl.Utf8,
-                "action_type": pl.Utf8,
-                "item_id": pl.Int64,
-                "details": pl.Utf8
-            })
-            logs_df.write_csv(LOG_FILE)
+        # Delete the log segments (and anything still queued)
+        log_sink.clear()
 
         # Delete imported files
-        files_to_delete = [
-            "imported_containers.csv",
-            "imported_items.csv",
-            "cargo_arrangement.csv"
-        ]
-
-        for file in files_to_delete:
-            if os.path.exists(file):
-                os.remove(file)
+        inventory_store.clear()
 
         return {"success": True, "message": "Logs and imported files cleared successfully"}
     except Exception as e:
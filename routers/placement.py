@@ -8,6 +8,7 @@ from schemas import (
     Coordinates
 )
 from algos.placement_algo import AdvancedCargoPlacement
+from storage.inventory_store import inventory_store
 import polars as pl
 from typing import List, Dict, Any
 from pydantic import BaseModel
@@ -93,17 +94,24 @@ async def process_placement(input_data: PlacementInput) -> PlacementResponse:
         placements = []
         all_rearrangements = []
 
+        cargo_df = inventory_store.cargo()
+
         # Process each container separately
         for container in input_data.containers:
             
             print(f"Processing container {container.container_id} for zone {container.zone}")
             
-            # Initialize advanced placement algorithm for this container
+            # Initialize advanced placement algorithm for this container,
+            # starting from the items already arranged in it
+            cargo_rows = []
+            if cargo_df is not None and "container_id" in cargo_df.columns:
+                cargo_rows = cargo_df.filter(pl.col("container_id") == container.container_id).to_dicts()
             cargo_placer = AdvancedCargoPlacement({
+                "container_id": container.container_id,
                 "width_cm": container.width_cm,
                 "depth_cm": container.depth_cm,
                 "height_cm": container.height_cm
-            })
+            }, cargo_rows=cargo_rows)
 
             # Get items assigned to this container's zone
             container_items = [
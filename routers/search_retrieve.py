@@ -1,22 +1,30 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 import polars as pl
 import os
-import re
 from typing import Optional, List
 from schemas import (
     Coordinates, 
     Position, 
     Item_for_search, 
     SearchResponse, 
+    SuggestResponse,
+    RetrievalCacheStats,
+    BatchSearchRequest,
+    BatchSearchResponse,
     RetrievalStep,
     RetrieveItemRequest,  
     PlaceItemRequest,           
-    PlaceItemResponse     
+    PlaceItemResponse,
+    ArrangementOverlap,
+    ValidateArrangementResponse
 )
 import datetime
 import csv
 from algos.retrieve_algo import PriorityAStarRetrieval, RetrievalPath
 from algos.search_algo import ItemSearchSystem
+from storage.inventory_store import inventory_store
+from storage.positions import POSITION_COLUMNS, position_values, upgrade_positions
+from storage.snapshot import SNAPSHOT_FORMAT, ipc_path, read_snapshot, snapshot_exists, write_snapshot
 import numpy as np
 import pandas as pd
 
@@ -28,6 +36,7 @@ router = APIRouter(
 cargo_file = "cargo_arrangement.csv"
 items_file = "imported_items.csv"
 containers_file = "imported_containers.csv"
+temp_cargo_file = "temp_cargo_arrangement.csv"
 
 @router.get("/search", response_model=SearchResponse)
 async def search_item(
@@ -37,30 +46,22 @@ async def search_item(
 ):
     try:
         # Load and validate required files
-        if not all(os.path.exists(file) for file in [items_file, containers_file, cargo_file]):
+        if not inventory_store.has("items", "containers", "cargo"):
             print(f"Missing required files. Checking: {items_file}, {containers_file}, {cargo_file}")
             return SearchResponse(success=False, found=False)
 
-        # Load all required data
-        items_df = pl.read_csv(items_file)
-        containers_df = pl.read_csv(containers_file)
-        cargo_df = pl.read_csv(cargo_file)
+        # Shared in-memory tables
+        items_df = inventory_store.items()
+        containers_df = inventory_store.containers()
+        cargo_df = inventory_store.cargo()
 
-        if items_df.is_empty() or containers_df.is_empty() or cargo_df.is_empty():
+        if items_df is None or containers_df is None or cargo_df is None or \
+                items_df.is_empty() or containers_df.is_empty() or cargo_df.is_empty():
             print("One or more data files are empty")
             return SearchResponse(success=False, found=False)
 
-        # Convert DataFrames to list of dicts
-        items_data = items_df.to_dicts()
-        containers_data = containers_df.to_dicts()
-        cargo_data = cargo_df.to_dicts()
-        
-        # Initialize search system
-        search_system = ItemSearchSystem(
-            items_data=items_data,
-            containers_data=containers_data,
-            cargo_data=cargo_data
-        )
+        # Long-lived index, kept up to date by the inventory store
+        search_system = inventory_store.search_index()
         
         # Perform search based on input
         if item_id is not None:
@@ -133,6 +134,72 @@ async def search_item(
         print(traceback.format_exc())
         return SearchResponse(success=False, found=False)
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_items_batch(request: BatchSearchRequest):
+    """Look up many items (by id and/or name) in one pass over the shared search index."""
+    try:
+        search_system = inventory_store.search_index()
+
+        # Names resolve like /search does: the first item with that name
+        queries = [(str(item_id), "id", item_id) for item_id in request.item_ids]
+        for name in request.names:
+            matches = search_system.name_index.exact(name)
+            queries.append((name, "name", matches[0] if matches else None))
+        print(f"Batch search for {len(request.item_ids)} ids and {len(request.names)} names")
+
+        found_ids = [item_id for _, _, item_id in queries if item_id is not None]
+        results_by_id = dict(zip(map(str, found_ids), search_system.search_many(found_ids)))
+
+        results = []
+        for query, search_type, item_id in queries:
+            result = results_by_id.get(str(item_id)) if item_id is not None else None
+            if not result or not result.get("success") or not result.get("found"):
+                results.append({"query": query, "found": False})
+                continue
+            results.append({
+                "query": query,
+                "found": True,
+                "item": result["item"],
+                "retrieval_steps": result.get("retrieval_steps") or []
+            })
+            if request.user_id:
+                from routers.logs import log_action
+                log_action(
+                    user_id=request.user_id,
+                    action_type="search",
+                    item_id=result["item"]["item_id"],
+                    details={"search_type": search_type, "query": query}
+                )
+
+        return {"success": True, "results": results}
+
+    except Exception as e:
+        print(f"Error in batch search endpoint: {str(e)}")
+        import traceback
+        print(traceback.format_exc())
+        return {"success": False, "results": []}
+
+@router.get("/search/suggest", response_model=SuggestResponse)
+async def suggest_items(
+    q: str = Query(..., description="Item name, or the start of one"),
+    limit: int = Query(10, ge=1, le=100),
+    fuzzy: bool = Query(True, description="Also return names within a few typos")
+):
+    """Name lookup for the search box: exact, prefix and typo-tolerant matches."""
+    try:
+        search_system = inventory_store.search_index()
+        return {"success": True, "matches": search_system.suggest(q, limit=limit, fuzzy=fuzzy)}
+    except Exception as e:
+        print(f"Error in suggest endpoint: {str(e)}")
+        import traceback
+        print(traceback.format_exc())
+        return {"success": False, "matches": []}
+
+@router.get("/search/cache", response_model=RetrievalCacheStats)
+async def retrieval_cache_stats():
+    """Hit/miss counters of the retrieval steps cache (size it with RETRIEVAL_CACHE_SIZE)."""
+    return inventory_store.search_index().cache_stats()
+
 @router.post("/retrieve")
 async def retrieve_item(request: RetrieveItemRequest):
     try:
@@ -143,24 +210,21 @@ async def retrieve_item(request: RetrieveItemRequest):
         if not timestamp:
             timestamp = datetime.datetime.now().isoformat()
 
-        items_file = "imported_items.csv"    
-        containers_file = "imported_containers.csv"
-        cargo_file = "cargo_arrangement.csv"
-        temp_cargo_file = "temp_cargo_arrangement.csv"
-        waste_file = "waste_items.csv"
-
         # Check if required files exist
-        if not os.path.exists(items_file) or not os.path.exists(containers_file):
+        if not inventory_store.has("items", "containers"):
             print(f"Missing required files. Please ensure all files exist.")
             return {"success": False}
 
-        # For retrieval, we'll prefer the temp cargo file if it exists, as it maintains original usage limits
-        cargo_read_file = temp_cargo_file if os.path.exists(temp_cargo_file) else cargo_file
-
-        # Load CSV data
-        items_df = pl.read_csv(items_file)
-        cargo_df = pl.read_csv(cargo_read_file)
-        containers_df = pl.read_csv(containers_file)
+        # For retrieval, we'll prefer the temp cargo arrangement if it exists, as it maintains original usage limits
+        cargo_df = inventory_store.temp_cargo()
+        cargo_read_file = temp_cargo_file
+        if cargo_df is None:
+            cargo_df = inventory_store.cargo()
+            cargo_read_file = cargo_file
+        items_df = inventory_store.items()
+        containers_df = inventory_store.containers()
+        if cargo_df is None or items_df is None or containers_df is None:
+            return {"success": False}
         
         print(f"Reading cargo data from: {cargo_read_file}")
 
@@ -188,15 +252,12 @@ async def retrieve_item(request: RetrieveItemRequest):
             "width_cm": float(container_dims["width_cm"]),
             "depth_cm": float(container_dims["depth_cm"]),
             "height_cm": float(container_dims["height_cm"])
-        })
+        }, items_data=inventory_store.item_metadata())
 
-        # Parse item coordinates
-        coord_str = item_in_cargo.select("coordinates")[0, 0]
-        print(f"Item coordinates: {coord_str}")
-        coords = re.findall(r'[-+]?\d*\.\d+|[-+]?\d+', coord_str)
-        
-        if len(coords) < 6:
-            print(f"Invalid coordinates format: {coord_str}")
+        # Item coordinates come straight from the typed position columns
+        item_position = item_in_cargo.row(0, named=True)
+        if any(item_position.get(column) is None for column in POSITION_COLUMNS):
+            print(f"Invalid coordinates for item {item_id}")
             return {"success": False}
 
         # Check usage limit and update
@@ -208,27 +269,14 @@ async def retrieve_item(request: RetrieveItemRequest):
         new_usage = current_usage - 1
         print(f"New usage limit for item {item_id}: {new_usage}")
 
-        updated_items_df = items_df.with_columns(
-            pl.when(pl.col("item_id") == item_id)
-            .then(pl.lit(new_usage))
-            .otherwise(pl.col("usage_limit"))
-            .alias("usage_limit")
-        )
-
-        # Write updated items data
-        updated_items_df.write_csv(items_file)
+        inventory_store.record_retrieval(item_id, new_usage)
         log_retrieval(item_id, user_id, timestamp)
 
         # Handle items with no uses left - only update the main cargo file
         if new_usage == 0:
             print(f"Removing item {item_id} from main cargo file as it has 0 uses left")
-            # Load the main cargo file for updating
-            main_cargo_df = pl.read_csv(cargo_file)
-            updated_cargo_df = main_cargo_df.filter(pl.col("item_id") != item_id)
-            updated_cargo_df.write_csv(cargo_file)
-
             container_id = container_data.select("container_id")[0, 0]
-            position_data = item_in_cargo.select("coordinates")[0, 0]
+            position_data = {column: item_position[column] for column in POSITION_COLUMNS}
 
             add_to_waste_items(
                 item_id=item_id,
@@ -248,30 +296,47 @@ async def retrieve_item(request: RetrieveItemRequest):
 
 def add_to_waste_items(item_id, name, reason, container_id, position):
     waste_file = "waste_items.csv"
-    new_waste_item = pl.DataFrame({
-        "item_id": [int(item_id)],
-        "name": [name],
-        "reason": [reason],
-        "container_id": [str(container_id)],
-        "position": [str(position)]
-    })
-
-    if not os.path.exists(waste_file):
+    new_waste_item = {
+        "item_id": int(item_id),
+        "name": name,
+        "reason": reason,
+        "container_id": str(container_id),
+        **{column: float(position[column]) for column in POSITION_COLUMNS}
+    }
+
+    if not snapshot_exists(waste_file):
         print(f"Creating new waste_items.csv file with item {item_id}")
-        new_waste_item.write_csv(waste_file)
+        write_snapshot(pl.DataFrame([new_waste_item]), waste_file)
+    elif append_waste_row(waste_file, new_waste_item):
+        print(f"Appended item {item_id} to existing waste_items.csv")
     else:
+        # IPC snapshot or an older layout: rewrite the table
         try:
-            waste_df = pl.read_csv(waste_file)
+            waste_df = upgrade_positions(read_snapshot(waste_file), "position")
             print(f"Appending item {item_id} to existing waste_items.csv")
-            updated_waste_df = pl.concat([waste_df, new_waste_item])
-            updated_waste_df.write_csv(waste_file)
+            updated_waste_df = pl.concat([waste_df, pl.DataFrame([new_waste_item])], how="diagonal_relaxed")
+            write_snapshot(updated_waste_df, waste_file)
         except Exception as e:
             print(f"Error appending to waste_items.csv: {str(e)}")
             print(f"Creating new waste_items.csv file with item {item_id}")
-            new_waste_item.write_csv(waste_file)
+            write_snapshot(pl.DataFrame([new_waste_item]), waste_file)
 
     print(f"Added item {item_id} to waste items with reason: {reason}")
 
+def append_waste_row(waste_file, row) -> bool:
+    """Append one row to a CSV snapshot whose header has all of its columns; False if it can't."""
+    if SNAPSHOT_FORMAT != "csv" or os.path.exists(ipc_path(waste_file)) or not os.path.exists(waste_file):
+        return False
+    with open(waste_file, newline='') as f:
+        header = next(csv.reader(f), None)
+    if not header or not set(row).issubset(header):
+        return False
+    with open(waste_file, 'a', newline='') as f:
+        writer = csv.writer(f)
+        # Columns only the identify endpoint fills (e.g. retrieval_steps) stay empty
+        writer.writerow([row.get(column, "") for column in header])
+    return True
+
 def log_retrieval(item_id, user_id, timestamp):
     log_file = "item_retrievals.csv"
     
@@ -290,16 +355,14 @@ async def place_item(request: PlaceItemRequest):
         if not request.timestamp:
             request.timestamp = datetime.datetime.now().isoformat()
 
-        cargo_file = "cargo_arrangement.csv"
-        temp_cargo_file = "temp_cargo_arrangement.csv"
-        containers_file = "imported_containers.csv"
-
-        if not os.path.exists(cargo_file) or not os.path.exists(containers_file):
+        if not inventory_store.has("cargo", "containers"):
             print(f"Required files not found")
             return {"success": False}
 
-        cargo_df = pl.read_csv(cargo_file)
-        containers_df = pl.read_csv(containers_file)
+        cargo_df = inventory_store.cargo()
+        containers_df = inventory_store.containers()
+        if cargo_df is None or containers_df is None:
+            return {"success": False}
 
         print(f"Cargo columns: {cargo_df.columns}")
         print(f"Containers columns: {containers_df.columns}")
@@ -315,110 +378,26 @@ async def place_item(request: PlaceItemRequest):
         # Get coordinates from the request's Position object
         start_coords = request.position.startCoordinates
         end_coords = request.position.endCoordinates
-        
-        # Create coordinate string in the expected format
-        coordinates_str = f"({start_coords.width_cm},{start_coords.depth_cm},{start_coords.height_cm}),({end_coords.width_cm},{end_coords.depth_cm},{end_coords.height_cm})"
-
-        item_exists = not cargo_df.filter(pl.col("item_id") == request.item_id).is_empty()
-
-        overlapping_items = cargo_df.filter(
-            (pl.col("zone") == zone) & 
-            (pl.col("item_id") != request.item_id)
-        )
+        position = position_values(request.position)
 
         print(f"Checking for overlaps in container {request.container_id} at zone {zone}")
         print(f"New item position: start={start_coords}, end={end_coords}")
 
-        overlapping = False
-        for item in overlapping_items.iter_rows(named=True):
-            item_coordinates = item["coordinates"]
-            coordinates = item_coordinates.strip()[1:-1].split("),(")
-            item_start = coordinates[0].split(",")
-            item_start = (float(item_start[0]), float(item_start[1]), float(item_start[2]))
-            item_end = coordinates[1].split(",")
-            item_end = (float(item_end[0]), float(item_end[1]), float(item_end[2]))
-
-            # Create tuples for comparison
-            start = (start_coords.width_cm, start_coords.depth_cm, start_coords.height_cm)
-            end = (end_coords.width_cm, end_coords.depth_cm, end_coords.height_cm)
-
-            print(f"Checking against item {item['item_id']} at coordinates {item_coordinates}")
-            print(f"Item start: {item_start}, Item end: {item_end}")
-            print(f"New item start: {start}, New item end: {end}")
-
-            # Check if the new item's position overlaps with existing items
-            # Using inclusive inequalities to handle adjacent items correctly
-            if (start[0] <= item_end[0] and end[0] >= item_start[0] and 
-                start[1] <= item_end[1] and end[1] >= item_start[1] and 
-                start[2] <= item_end[2] and end[2] >= item_start[2]):
-                print(f"Overlap detected with item {item['item_id']} at coordinates {item_coordinates}")
-                overlapping = True
-                break
+        # Check if the new item's position overlaps with existing items in the container
+        # Using inclusive inequalities to handle adjacent items correctly
+        overlapping_items = inventory_store.find_overlaps(request.container_id, position, exclude_item_id=request.item_id)
+
+        overlapping = len(overlapping_items) > 0
+        if overlapping:
+            print(f"Overlap detected with item {overlapping_items[0]}")
 
         if overlapping:
             print(f"Cannot place item {request.item_id} in container {request.container_id} due to overlap")
             return {"success": False}
 
-        # Update the main cargo arrangement file
-        if item_exists:
-            # For the main cargo file
-            updated_cargo_df = cargo_df.with_columns([
-                pl.when(pl.col("item_id") == request.item_id)
-                  .then(pl.lit(zone))
-                  .otherwise(pl.col("zone"))
-                  .alias("zone"),
-                pl.when(pl.col("item_id") == request.item_id)
-                  .then(pl.lit(coordinates_str))
-                  .otherwise(pl.col("coordinates"))
-                  .alias("coordinates")
-            ])
-            updated_cargo_df.write_csv(cargo_file)
-        else:
-            new_row = pl.DataFrame({
-                "item_id": [request.item_id],
-                "zone": [zone],
-                "coordinates": [coordinates_str]
-            })
-            updated_cargo_df = pl.concat([cargo_df, new_row])
-            updated_cargo_df.write_csv(cargo_file)
-        
-        # Also update the temp cargo arrangement file if it exists
-        if os.path.exists(temp_cargo_file):
-            try:
-                temp_cargo_df = pl.read_csv(temp_cargo_file)
-                temp_item_exists = not temp_cargo_df.filter(pl.col("item_id") == request.item_id).is_empty()
-                
-                if temp_item_exists:
-                    # Update existing item in temp file
-                    updated_temp_df = temp_cargo_df.with_columns([
-                        pl.when(pl.col("item_id") == request.item_id)
-                          .then(pl.lit(zone))
-                          .otherwise(pl.col("zone"))
-                          .alias("zone"),
-                        pl.when(pl.col("item_id") == request.item_id)
-                          .then(pl.lit(coordinates_str))
-                          .otherwise(pl.col("coordinates"))
-                          .alias("coordinates")
-                    ])
-                    updated_temp_df.write_csv(temp_cargo_file)
-                else:
-                    # Add new item to temp file
-                    new_row = pl.DataFrame({
-                        "item_id": [request.item_id],
-                        "zone": [zone],
-                        "coordinates": [coordinates_str]
-                    })
-                    updated_temp_df = pl.concat([temp_cargo_df, new_row])
-                    updated_temp_df.write_csv(temp_cargo_file)
-                
-                print(f"Updated both {cargo_file} and {temp_cargo_file}")
-            except Exception as e:
-                print(f"Error updating temp cargo file: {str(e)}")
-                print(f"Only updated the main cargo file")
-        else:
-            # Just copy the main file to the temp file
-            updated_cargo_df.write_csv(temp_cargo_file)
-            print(f"Created new {temp_cargo_file} as a copy of {cargo_file}")
+        # Update the main and temp cargo arrangements
+        inventory_store.upsert_placement(request.item_id, zone, request.container_id, position)
+        print(f"Updated both {cargo_file} and {temp_cargo_file}")
 
         return {"success": True}
 
@@ -426,4 +405,22 @@ async def place_item(request: PlaceItemRequest):
         print(f"Error in place endpoint: {str(e)}")
         import traceback
         print(traceback.format_exc())
-        return {"success": False}
\ No newline at end of file
+        return {"success": False}
+
+@router.get("/place/validate", response_model=ValidateArrangementResponse)
+async def validate_arrangement():
+    """Check the whole cargo arrangement for items that share volume inside a container."""
+    try:
+        overlaps = [
+            ArrangementOverlap(container_id=container_id, item_id=item_id, other_item_id=other_item_id)
+            for container_id, pairs in inventory_store.arrangement_overlaps().items()
+            for item_id, other_item_id in pairs
+        ]
+        print(f"Validated {len(inventory_store.spatial_index())} placements, {len(overlaps)} overlaps")
+        return {"success": True, "valid": not overlaps, "overlaps": overlaps}
+
+    except Exception as e:
+        print(f"Error in validate endpoint: {str(e)}")
+        import traceback
+        print(traceback.format_exc())
+        return {"success": False, "valid": False, "overlaps": []}
\ No newline at end of file
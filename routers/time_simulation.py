@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from typing import List, Optional, Union
 import polars as pl
 import os
+from storage.inventory_store import inventory_store
 
 router = APIRouter(
     prefix="/api/simulate",
@@ -30,13 +31,13 @@ class TimeSimulationRequest(BaseModel):
 @router.post("/day")
 async def simulate_day(request: TimeSimulationRequest):
     try:
-        if not os.path.exists("imported_items.csv"):
+        items_df = inventory_store.items()
+        if items_df is None:
             return {
                 "success": False,
                 "error": "Imported items data not found"
             }
-        
-        items_df = pl.read_csv("imported_items.csv")
+
         current_date = datetime.now()
 
         # Handle empty or invalid dates
@@ -65,6 +66,7 @@ async def simulate_day(request: TimeSimulationRequest):
 
         items_used = []
         items_expired = []
+        new_usage_limits = {}
         items_depleted_today = []
 
         # Process each day
@@ -122,6 +124,7 @@ async def simulate_day(request: TimeSimulationRequest):
                         .alias("usage_limit")
                     ])
                     
+                    new_usage_limits[int(item["item_id"])] = new_uses
                     items_used.append({
                         "item_id": int(item["item_id"]),
                         "name": str(item["name"]),
@@ -134,8 +137,12 @@ async def simulate_day(request: TimeSimulationRequest):
                             "name": str(item["name"])
                         })
 
-        # Save updated state
-        items_df.write_csv("imported_items.csv")
+        # Save updated state as per-item journal records
+        expired_ids = [item["item_id"] for item in items_expired]
+        for item_id, usage_limit in new_usage_limits.items():
+            if item_id not in expired_ids:
+                inventory_store.set_usage_limit(item_id, usage_limit)
+        inventory_store.remove_items(expired_ids)
 
         return {
             "success": True,
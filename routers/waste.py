@@ -1,15 +1,15 @@
 import json
-import re
-import csv
 import os
 from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
 import polars as pl
 from datetime import datetime
-from schemas import Position, ReturnPlanRequest, ReturnPlanResponse, ReturnItem, ReturnPlanStep, RetrievalStep, CompleteUndockingRequest, Object3D, ReturnManifest
+from schemas import Position, ReturnPlanRequest, ReturnPlanResponse, ReturnItem, ReturnPlanStep, RetrievalStep, CompleteUndockingRequest, ReturnManifest
 import httpx
-from algos.search_algo import ItemSearchSystem
+from storage.inventory_store import inventory_store
+from storage.positions import position_values, row_position, upgrade_positions
+from storage.snapshot import delete_snapshot, read_snapshot, snapshot_exists, write_snapshot
 from algos.waste_algo import (
     load_waste_items,
     load_imported_items,
@@ -30,7 +30,10 @@ async def search_retrieve(item_id: int, zone: str) -> dict:
     async with httpx.AsyncClient() as client:
         try:
             # First, check if the item exists in the cargo arrangement data
-            cargo_df = pl.read_csv("cargo_arrangement.csv")
+            cargo_df = inventory_store.cargo()
+            if cargo_df is None:
+                print(f"Item {item_id} not found in cargo arrangement data")
+                return {"success": False, "found": False, "retrieval_steps": []}
             # Convert item_id to string for comparison
             item_data = cargo_df.filter(pl.col("item_id").cast(str) == str(item_id)).to_dicts()
             
@@ -61,81 +64,37 @@ async def search_retrieve(item_id: int, zone: str) -> dict:
             print(f"Traceback: {traceback.format_exc()}")
             return {"success": False, "found": False, "retrieval_steps": []}
 
-def parse_position(position_str: str) -> dict:
-    """
-    Parse a position string formatted as:
-    "(x,y,z),(x,y,z)"
-    and return a dict with startCoordinates and endCoordinates.
-    """
-    pattern = r"\((.*?)\)"
-    matches = re.findall(pattern, position_str)
-
-    if len(matches) != 2:
-        return {
-            "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
-            "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
-        }
+ZERO_POSITION = {
+    "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
+    "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
+}
 
-    try:
-        def parse_tuple(tuple_str: str) -> dict:
-            values = [float(v) for v in tuple_str.split(",")]
-            return {"width_cm": values[0], "depth_cm": values[1], "height_cm": values[2]}
-        
-        start_coords = parse_tuple(matches[0])
-        end_coords = parse_tuple(matches[1])
-        
-        return {
-            "startCoordinates": start_coords,
-            "endCoordinates": end_coords
-        }
-    except Exception as e:
-        print(f"Error parsing position tuple: {str(e)}")
-        return {
-            "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
-            "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
-        }
+def waste_retrieval_steps(item: Dict) -> List[Dict]:
+    """Retrieval steps of a placed waste item; just the retrieve step when nothing blocks it."""
+    # Blockers come from the container's DAG in the shared search index
+    retrieval_steps = inventory_store.search_index().retrieval_steps(item.get("item_id", ""))
+    if not retrieval_steps:
+        retrieval_steps = [{
+            "step": 1,
+            "action": "retrieve",
+            "item_id": int(item.get("item_id", "0")),
+            "item_name": item.get("name", "")
+        }]
+    return retrieval_steps
 
 @router.get("/identify")
 async def identify_waste():
     waste_file = "waste_items.csv"
-    imported_file = "imported_items.csv"
     waste_items = []
     new_waste_items = []  # To track newly identified waste items for appending
 
     # Load existing waste items from waste_items.csv if it exists.
-    if os.path.exists(waste_file):
+    if snapshot_exists(waste_file):
         try:
-            waste_df = pl.read_csv(waste_file)
+            waste_df = upgrade_positions(read_snapshot(waste_file), "position")
             if not waste_df.is_empty():
                 for item in waste_df.to_dicts():
-                    position_value = item.get("position", "")
-                    if isinstance(position_value, str):
-                        if position_value.strip().startswith("{"):
-                            try:
-                                position_dict = json.loads(position_value)
-                            except Exception as e:
-                                print(f"JSON parsing error: {str(e)}")
-                                position_dict = {
-                                    "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
-                                    "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
-                                }
-                        elif position_value.strip().startswith("("):
-                            position_dict = parse_position(position_value)
-                        else:
-                            position_dict = {
-                                "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
-                                "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
-                            }
-                    else:
-                        position_dict = {
-                            "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
-                            "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
-                        }
-                    
-                    position_model = Position(
-                        startCoordinates=position_dict.get("startCoordinates", {"width_cm": 0, "depth_cm": 0, "height_cm": 0}),
-                        endCoordinates=position_dict.get("endCoordinates", {"width_cm": 0, "depth_cm": 0, "height_cm": 0})
-                    )
+                    position_model = Position(**(row_position(item) or ZERO_POSITION))
                     
                     # Fix: Ensure item_id is cast to int safely with default value
                     try:
@@ -149,16 +108,18 @@ async def identify_waste():
                         "reason": str(item.get("reason", "")),
                         "container_id": str(item.get("container_id", "")),
                         "position": position_model.dict(),
-                        "retrieval_steps": json.loads(item.get("retrieval_steps", "[]"))
+                        "retrieval_steps": json.loads(item.get("retrieval_steps") or "[]")
                     }
                     waste_items.append(formatted_item)
         except Exception as e:
             print(f"Error reading waste_items.csv: {str(e)}")
     
     # Now, check imported_items.csv for expired items.
-    if os.path.exists(imported_file):
+    imported_df = inventory_store.items()
+    cargo_df = inventory_store.cargo()
+    containers_df = inventory_store.containers()
+    if imported_df is not None:
         try:
-            imported_df = pl.read_csv(imported_file)
             current_date = datetime.now().date()
             print(f"Current date: {current_date}")
             
@@ -175,72 +136,24 @@ async def identify_waste():
                     print(f"Processing item with usage_limit = 0: {item}")
                     # Lookup container_id from cargo_arrangement.csv first
                     container_id = ""
-                    position_str = "(0,0,0),(0,0,0)"  # Default value for CSV
                     retrieval_steps = []
                     # Initialize coordinates with default values
-                    coordinates = {
-                        "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
-                        "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
-                    }
+                    coordinates = ZERO_POSITION
                     
-                    if os.path.exists("cargo_arrangement.csv"):
+                    if cargo_df is not None:
                         try:
-                            cargo_df = pl.read_csv("cargo_arrangement.csv")
                             # Fix: Cast both sides to string for comparison
                             cargo_matching = cargo_df.filter(pl.col("item_id").cast(pl.Utf8) == str(item.get("item_id", ""))).to_dicts()
                             if cargo_matching:
                                 container_id = str(cargo_matching[0].get("container_id", ""))
-                                pos_str = cargo_matching[0].get("coordinates", "")
-                                if pos_str:
-                                    coordinates = parse_position(pos_str)
-                                    position_str = pos_str
-                                    
-                                # Calculate retrieval steps
-                                items_in_container = cargo_df.filter(
-                                    (pl.col("container_id") == container_id) & 
-                                    (pl.col("item_id").cast(str) != str(item.get("item_id", "")))
-                                ).to_dicts()
-                                
-                                # Sort items by depth (front to back)
-                                items_in_container.sort(key=lambda x: float(x["coordinates"].split(",")[1]))
-                                
-                                step_number = 1
-                                
-                                # Remove blocking items (front to back)
-                                for blocking_item in items_in_container:
-                                    retrieval_steps.append({
-                                        "step": step_number,
-                                        "action": "remove",
-                                        "item_id": int(blocking_item["item_id"]),
-                                        "item_name": blocking_item["name"]
-                                    })
-                                    step_number += 1
-                                    
-                                # Retrieve target item
-                                retrieval_steps.append({
-                                    "step": step_number,
-                                    "action": "retrieve",
-                                    "item_id": int(item.get("item_id", "0")),
-                                    "item_name": item.get("name", "")
-                                })
-                                step_number += 1
-                                
-                                # Place back blocking items (back to front)
-                                for blocking_item in reversed(items_in_container):
-                                    retrieval_steps.append({
-                                        "step": step_number,
-                                        "action": "place",
-                                        "item_id": int(blocking_item["item_id"]),
-                                        "item_name": blocking_item["name"]
-                                    })
-                                    step_number += 1
+                                coordinates = row_position(cargo_matching[0]) or ZERO_POSITION
+                                retrieval_steps = waste_retrieval_steps(item)
                         except Exception as e:
                             print(f"Error reading cargo_arrangement.csv: {str(e)}")
                     
                     # Only if not found in cargo_arrangement.csv, try imported_containers.csv
-                    if not container_id and os.path.exists("imported_containers.csv"):
+                    if not container_id and containers_df is not None:
                         try:
-                            containers_df = pl.read_csv("imported_containers.csv")
                             # Assume imported_containers.csv has columns: container_id, zone, ...
                             matching_container = containers_df.filter(pl.col("zone") == item.get("preferred_zone", "")).to_dicts()
                             if matching_container:
@@ -277,7 +190,7 @@ async def identify_waste():
                         "name": item_name,
                         "reason": "Usage Limit is 0",
                         "container_id": container_id,
-                        "position": position_str,
+                        **position_values(coordinates),
                         "retrieval_steps": json.dumps(retrieval_steps)
                     }
                     
@@ -316,72 +229,24 @@ async def identify_waste():
                     print(f"Processing expired item: {item}")
                     # Lookup container_id from cargo_arrangement.csv first
                     container_id = ""
-                    position_str = "(0,0,0),(0,0,0)"  # Default value for CSV
                     retrieval_steps = []
                     # Initialize coordinates with default values
-                    coordinates = {
-                        "startCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0},
-                        "endCoordinates": {"width_cm": 0, "depth_cm": 0, "height_cm": 0}
-                    }
+                    coordinates = ZERO_POSITION
                     
-                    if os.path.exists("cargo_arrangement.csv"):
+                    if cargo_df is not None:
                         try:
-                            cargo_df = pl.read_csv("cargo_arrangement.csv")
                             # Fix: Cast both sides to string for comparison
                             cargo_matching = cargo_df.filter(pl.col("item_id").cast(pl.Utf8) == str(item.get("item_id", ""))).to_dicts()
                             if cargo_matching:
                                 container_id = str(cargo_matching[0].get("container_id", ""))
-                                pos_str = cargo_matching[0].get("coordinates", "")
-                                if pos_str:
-                                    coordinates = parse_position(pos_str)
-                                    position_str = pos_str
-                                    
-                                # Calculate retrieval steps
-                                items_in_container = cargo_df.filter(
-                                    (pl.col("container_id") == container_id) & 
-                                    (pl.col("item_id").cast(str) != str(item.get("item_id", "")))
-                                ).to_dicts()
-                                
-                                # Sort items by depth (front to back)
-                                items_in_container.sort(key=lambda x: float(x["coordinates"].split(",")[1]))
-                                
-                                step_number = 1
-                                
-                                # Remove blocking items (front to back)
-                                for blocking_item in items_in_container:
-                                    retrieval_steps.append({
-                                        "step": step_number,
-                                        "action": "remove",
-                                        "item_id": int(blocking_item["item_id"]),
-                                        "item_name": blocking_item["name"]
-                                    })
-                                    step_number += 1
-                                    
-                                # Retrieve target item
-                                retrieval_steps.append({
-                                    "step": step_number,
-                                    "action": "retrieve",
-                                    "item_id": int(item.get("item_id", "0")),
-                                    "item_name": item.get("name", "")
-                                })
-                                step_number += 1
-                                
-                                # Place back blocking items (back to front)
-                                for blocking_item in reversed(items_in_container):
-                                    retrieval_steps.append({
-                                        "step": step_number,
-                                        "action": "place",
-                                        "item_id": int(blocking_item["item_id"]),
-                                        "item_name": blocking_item["name"]
-                                    })
-                                    step_number += 1
+                                coordinates = row_position(cargo_matching[0]) or ZERO_POSITION
+                                retrieval_steps = waste_retrieval_steps(item)
                         except Exception as e:
                             print(f"Error reading cargo_arrangement.csv: {str(e)}")
                     
                     # Only if not found in cargo_arrangement.csv, try imported_containers.csv
-                    if not container_id and os.path.exists("imported_containers.csv"):
+                    if not container_id and containers_df is not None:
                         try:
-                            containers_df = pl.read_csv("imported_containers.csv")
                             # Assume imported_containers.csv has columns: container_id, zone, ...
                             matching_container = containers_df.filter(pl.col("zone") == item.get("preferred_zone", "")).to_dicts()
                             if matching_container:
@@ -418,7 +283,7 @@ async def identify_waste():
                         "name": item_name,
                         "reason": "Expired",
                         "container_id": container_id,
-                        "position": position_str,
+                        **position_values(coordinates),
                         "retrieval_steps": json.dumps(retrieval_steps)
                     }
                     
@@ -432,52 +297,25 @@ async def identify_waste():
             if new_waste_items:
                 print(f"Appending {len(new_waste_items)} new waste items to waste_items.csv")
                 
-                # If the waste file exists, read it and combine with new items
-                if os.path.exists(waste_file):
-                    try:
-                        # Read existing items
-                        existing_items = []
-                        with open(waste_file, 'r') as f:
-                            reader = csv.DictReader(f)
-                            existing_items = list(reader)
-                            print(f"Found {len(existing_items)} existing items in waste_items.csv")
-                        
+                try:
+                    new_waste_df = pl.DataFrame(new_waste_items)
+                    # If the waste file exists, read it and combine with new items
+                    if snapshot_exists(waste_file):
+                        existing_df = upgrade_positions(read_snapshot(waste_file), "position")
+                        print(f"Found {len(existing_df)} existing items in waste_items.csv")
                         # Add new items that aren't already in the file
-                        existing_item_ids = {item['item_id'] for item in existing_items}
-                        new_items_added = 0
-                        for new_item in new_waste_items:
-                            if str(new_item['item_id']) not in existing_item_ids:
-                                existing_items.append(new_item)
-                                new_items_added += 1
-                        
-                        print(f"Adding {new_items_added} new items to waste_items.csv")
-                        
-                        # Write all items back to the file
-                        with open(waste_file, 'w', newline='') as f:
-                            writer = csv.DictWriter(f, fieldnames=['item_id', 'name', 'reason', 'container_id', 'position', 'retrieval_steps'])
-                            writer.writeheader()
-                            writer.writerows(existing_items)
-                        
-                        print(f"Successfully wrote {len(existing_items)} items to waste_items.csv")
-                    except Exception as e:
-                        print(f"Error appending to waste_items.csv: {str(e)}")
-                        print(f"Error type: {type(e)}")
-                        import traceback
-                        print(f"Traceback: {traceback.format_exc()}")
-                else:
-                    print("Creating new waste_items.csv")
-                    # Create new file with waste items
-                    try:
-                        with open(waste_file, 'w', newline='') as f:
-                            writer = csv.DictWriter(f, fieldnames=['item_id', 'name', 'reason', 'container_id', 'position', 'retrieval_steps'])
-                            writer.writeheader()
-                            writer.writerows(new_waste_items)
-                        print(f"Successfully created waste_items.csv with {len(new_waste_items)} items")
-                    except Exception as e:
-                        print(f"Error creating waste_items.csv: {str(e)}")
-                        print(f"Error type: {type(e)}")
-                        import traceback
-                        print(f"Traceback: {traceback.format_exc()}")
+                        new_waste_df = new_waste_df.filter(~pl.col("item_id").is_in(existing_df["item_id"].to_list()))
+                        print(f"Adding {len(new_waste_df)} new items to waste_items.csv")
+                        new_waste_df = pl.concat([existing_df, new_waste_df], how="diagonal_relaxed")
+                    else:
+                        print("Creating new waste_items.csv")
+                    write_snapshot(new_waste_df, waste_file)
+                    print(f"Successfully wrote {len(new_waste_df)} items to waste_items.csv")
+                except Exception as e:
+                    print(f"Error appending to waste_items.csv: {str(e)}")
+                    print(f"Error type: {type(e)}")
+                    import traceback
+                    print(f"Traceback: {traceback.format_exc()}")
                     
         except Exception as e:
             print(f"Error processing imported_items.csv for expiry: {str(e)}")
@@ -490,119 +328,13 @@ def calculate_volume(obj):
     height = abs(obj.end["height_cm"] - obj.start["height_cm"])
     return width * depth * height
 
-def read_waste_data(waste_filename, imported_filename):
-    print(f"\nReading waste data from {waste_filename}")
-    objects = []
-    imported_items = load_imported_items(imported_filename)  # Use the function from waste_algo.py
-    print(f"Loaded imported items: {imported_items}")
-    weights = {}
-
-    if not os.path.exists(waste_filename):
-        print(f"Warning: {waste_filename} does not exist")
-        return objects, weights
-    
-    try:
-        waste_df = pl.read_csv(waste_filename)
-        if waste_df.is_empty():
-            print("Waste file is empty")
-            return objects, weights
-            
-        for row in waste_df.to_dicts():
-            print(f"\nProcessing row: {row}")
-            
-            # Get and validate item_id
-            item_id = str(row.get("item_id", "")).strip()
-            if not item_id:
-                print(f"Skipping row with empty item_id: {row}")
-                continue
-            print(f"Processing item_id: {item_id}")
-            
-            # Get and validate container_id
-            container_id = str(row.get("container_id", "")).strip()
-            if not container_id:
-                print(f"Skipping row with empty container_id: {row}")
-                continue
-            print(f"Container_id: {container_id}")
-            
-            # Parse position
-            position_str = str(row.get("position", ""))
-            coordinates = parse_position(position_str)
-            print(f"Parsed coordinates: {coordinates}")
-            
-            # Get weight from imported items
-            weight = imported_items.get(item_id, 0)
-            print(f"Found weight: {weight}")
-            
-            # Create Object3D with positional parameters
-            obj = Object3D(
-                item_id,
-                str(row.get("name", "")),
-                container_id,
-                coordinates["startCoordinates"],
-                coordinates["endCoordinates"]
-            )
-            print(f"Created Object3D: {obj.__dict__}")
-            objects.append(obj)
-            weights[item_id] = weight
-
-    except Exception as e:
-        print(f"Error reading waste data: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        return objects, weights
-
-    print(f"\nTotal objects read: {len(objects)}")
-    print(f"Total weights: {weights}")
-    return objects, weights
-
 def calculate_retrieval_steps(item_id: int, container_id: str, cargo_df: pl.DataFrame, containers_df: pl.DataFrame) -> List[Dict]:
     """Calculate the steps needed to retrieve an item from a container."""
     print(f"\nCalculating retrieval steps for item {item_id} in container {container_id}")
     
     try:
-        # Read imported items data for item details
-        imported_df = pl.read_csv("imported_items.csv")
-        print(f"Read imported items data with {len(imported_df)} rows")
-        
-        # Convert DataFrames to lists of dictionaries for ItemSearchSystem
-        items_data = []
-        for item in imported_df.to_dicts():
-            items_data.append({
-                "item_id": str(item.get("item_id", "")),
-                "name": str(item.get("name", "")),
-                "width_cm": float(item.get("width_cm", 0)),
-                "depth_cm": float(item.get("depth_cm", 0)),
-                "height_cm": float(item.get("height_cm", 0)),
-                "priority": int(item.get("priority", 1)),
-                "usage_limit": int(item.get("usage_limit", 0))
-            })
-            
-        containers_data = containers_df.to_dicts()
-        
-        # Convert cargo data with proper position format
-        cargo_data = []
-        for item in cargo_df.to_dicts():
-            position_str = item.get("coordinates", "")
-            if position_str:
-                try:
-                    coords = [float(x) for x in position_str.replace('(', '').replace(')', '').split(',')]
-                    if len(coords) >= 6:
-                        cargo_data.append({
-                            "item_id": str(item.get("item_id", "")),
-                            "container_id": str(item.get("container_id", "")),
-                            "zone": str(item.get("zone", "")),
-                            "coordinates": position_str
-                        })
-                except Exception as e:
-                    print(f"Error parsing coordinates for item {item.get('item_id', '')}: {str(e)}")
-        
-        # Create ItemSearchSystem instance
-        search_system = ItemSearchSystem(
-            items_data=items_data,
-            containers_data=containers_data,
-            cargo_data=cargo_data
-        )
+        # The shared search index keeps each container's blocker DAG
+        search_system = inventory_store.search_index()
         
         # Search for the item using the optimized algorithm
         result = search_system.search_by_id(item_id)
@@ -661,7 +393,7 @@ async def generate_return_plan(request: ReturnPlanRequest):
         
         # Load waste items and imported items data using the functions from waste_algo.py
         waste_items = load_waste_items()  # Using default filename
-        imported_items = load_imported_items()  # Using default filename
+        imported_items = load_imported_items()
         
         print(f"Loaded {len(waste_items)} waste items")
         print(f"Loaded {len(imported_items)} imported items")
@@ -772,38 +504,42 @@ async def generate_return_plan(request: ReturnPlanRequest):
 @router.post("/complete-undocking")
 async def complete_undocking(request: CompleteUndockingRequest):
     waste_file = "waste_items.csv"
-    items_file = "imported_items.csv"
     items_count = 0
     
     # First, handle existing waste items
     existing_waste_items = []
-    if os.path.exists(waste_file):
+    undocked_item_ids = []
+    if snapshot_exists(waste_file):
         try:
-            waste_items_df = pl.read_csv(waste_file)
+            waste_items_df = upgrade_positions(read_snapshot(waste_file), "position")
             if not waste_items_df.is_empty():
                 # Keep only items that are NOT in the undocking container
                 existing_waste_items = waste_items_df.filter(
                     pl.col("container_id") != request.undocking_container_id
                 ).to_dicts()
                 # Count items being removed
-                items_count = waste_items_df.filter(
+                undocked_item_ids = waste_items_df.filter(
                     pl.col("container_id") == request.undocking_container_id
-                ).height
+                )["item_id"].to_list()
+                items_count = len(undocked_item_ids)
                 
                 # Write back the filtered waste items
                 if existing_waste_items:
                     waste_df = pl.DataFrame(existing_waste_items)
-                    waste_df.write_csv(waste_file)
+                    write_snapshot(waste_df, waste_file)
                 else:
                     # If no items left, delete the file
-                    os.remove(waste_file)
+                    delete_snapshot(waste_file)
         except Exception as e:
             print(f"Error processing waste items: {str(e)}")
     
+    # Undocked waste leaves the station, so drop its placements
+    inventory_store.undock(request.undocking_container_id, undocked_item_ids)
+
     # Then handle items that have reached their usage limit
-    if os.path.exists(items_file):
+    items_df = inventory_store.items()
+    if items_df is not None:
         try:
-            items_df = pl.read_csv(items_file)
             if "usage_count" in items_df.columns and "usage_limit" in items_df.columns:
                 # Check for items that have reached their usage limit OR have a usage limit of 0
                 expired_items = items_df.filter(
@@ -819,7 +555,7 @@ async def complete_undocking(request: CompleteUndockingRequest):
                            (pl.col("usage_limit") == 0)) & 
                           (pl.col("container_id") == request.undocking_container_id))
                     )
-                    items_df.write_csv(items_file)
+                    inventory_store.replace_items(items_df)
         
         except Exception as e:
             print(f"Error processing items at usage limit: {str(e)}")
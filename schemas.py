@@ -373,6 +373,38 @@ class SearchResponse(BaseModel):
     item: Optional[Item_for_search] = None
     retrieval_steps: List[RetrievalStep] = []
 
+class BatchSearchRequest(BaseModel):
+    item_ids: List[int] = []
+    names: List[str] = []
+    user_id: Optional[str] = None
+
+class BatchSearchResult(BaseModel):
+    query: str  # the requested item_id or name
+    found: bool
+    item: Optional[Item_for_search] = None
+    retrieval_steps: List[RetrievalStep] = []
+
+class BatchSearchResponse(BaseModel):
+    success: bool
+    results: List[BatchSearchResult] = []
+
+class NameMatch(BaseModel):
+    item_id: int
+    name: str
+    match: str  # "exact", "prefix", "fuzzy"
+    score: float
+
+class SuggestResponse(BaseModel):
+    success: bool
+    matches: List[NameMatch] = []
+
+class RetrievalCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    size: int
+    capacity: int
+
 class PlaceItemRequest(BaseModel):
     item_id: int
     container_id: str
@@ -382,6 +414,16 @@ class PlaceItemRequest(BaseModel):
 class PlaceItemResponse(BaseModel):
     success: bool
 
+class ArrangementOverlap(BaseModel):
+    container_id: str
+    item_id: int
+    other_item_id: int
+
+class ValidateArrangementResponse(BaseModel):
+    success: bool
+    valid: bool
+    overlaps: List[ArrangementOverlap] = []
+
 class ReturnPlanRequest(BaseModel):
     undocking_container_id: str
     undocking_date: str
@@ -1,5 +1,5 @@
-import { useState } from 'react';
-import { searchItem } from '../services/apiService';
+import { useRef, useState } from 'react';
+import { searchItem, suggestItems } from '../services/apiService';
 
 const SearchComponent = () => {
   const [searchParams, setSearchParams] = useState({
@@ -11,6 +11,8 @@ const SearchComponent = () => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [showSteps, setShowSteps] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
+  const latestQuery = useRef('');
 
   const handleInputChange = (e) => {
     const { name, value } = e.target;
@@ -18,6 +20,36 @@ const SearchComponent = () => {
       ...prev,
       [name]: value
     }));
+    if (name === 'itemName') {
+      updateSuggestions(value);
+    }
+  };
+
+  const updateSuggestions = async (query) => {
+    latestQuery.current = query;
+    if (!query.trim()) {
+      setSuggestions([]);
+      return;
+    }
+    try {
+      const matches = await suggestItems(query);
+      // Ignore answers to an older query that arrive after a newer one
+      if (latestQuery.current === query) {
+        setSuggestions(matches);
+      }
+    } catch (err) {
+      console.error('Suggest error:', err);
+      setSuggestions([]);
+    }
+  };
+
+  const handleSelectSuggestion = (match) => {
+    setSearchParams(prev => ({
+      ...prev,
+      itemId: String(match.item_id),
+      itemName: match.name
+    }));
+    setSuggestions([]);
   };
 
   const handleSearch = async () => {
@@ -117,7 +149,22 @@ const SearchComponent = () => {
             onChange={handleInputChange}
             placeholder="Enter Item Name"
             className="border p-2 w-full rounded-md"
+            autoComplete="off"
           />
+          {suggestions.length > 0 && (
+            <ul className="absolute z-10 w-full bg-white border rounded-md shadow mt-1 max-h-60 overflow-y-auto">
+              {suggestions.map((match) => (
+                <li
+                  key={match.item_id}
+                  onClick={() => handleSelectSuggestion(match)}
+                  className="px-3 py-2 text-sm cursor-pointer hover:bg-blue-50 flex justify-between"
+                >
+                  <span>{match.name}</span>
+                  <span className="text-gray-400">#{match.item_id}</span>
+                </li>
+              ))}
+            </ul>
+          )}
           <p className="text-xs text-gray-500 mt-1">
             Provide either Item ID or Item Name
           </p>
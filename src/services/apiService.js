@@ -47,6 +47,11 @@ export const searchItem = async (params) => {
   }
 };
 
+export const suggestItems = async (query, limit = 8) => {
+  const response = await api.get('/search/suggest', { params: { q: query, limit } });
+  return response.data.matches || [];
+};
+
 export const retrieveItem = async (data) => {
   return api.post('/retrieve', {
     item_id: data.itemId,
@@ -0,0 +1,341 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import polars as pl
+from algos.retrieve_algo import item_metadata
+from algos.search_algo import ItemSearchSystem
+from storage.journal import InventoryJournal
+from storage.positions import POSITION_COLUMNS, row_position, upgrade_positions
+from storage.snapshot import delete_snapshot, read_snapshot, snapshot_stamp, write_snapshot
+from storage.spatial_index import SpatialIndex, position_box
+
+ITEMS_FILE = "imported_items.csv"
+CONTAINERS_FILE = "imported_containers.csv"
+CARGO_FILE = "cargo_arrangement.csv"
+TEMP_CARGO_FILE = "temp_cargo_arrangement.csv"
+
+# Number of journal records after which the snapshots are rewritten
+COMPACT_EVERY = int(os.environ.get("INVENTORY_COMPACT_EVERY", "500"))
+
+
+class InventoryStore:
+    """
+    Process-wide in-memory copy of the inventory tables.
+
+    The CSV files (or their Arrow IPC counterparts, see storage.snapshot) are
+    snapshots: they are loaded once and every read is served from memory.
+    Single-item mutations (retrieve, place, usage, undock) are applied in
+    memory and appended to the journal as one small record instead of
+    rewriting the snapshots; every COMPACT_EVERY records, and on shutdown, the
+    touched snapshots are rewritten and the journal is truncated. Loading a
+    snapshot always replays the journal tail on top of it.
+
+    A table is only re-read when its file changes outside the app (different
+    mtime or size than the last load/write).
+
+    Three indexes are derived from the tables, built on first use and kept in
+    step by every mutation: a per-container spatial index of the cargo
+    placements, the ItemSearchSystem behind /api/search and the item
+    metadata (expiry dates parsed) read by the retrieval planner.
+    """
+
+    def __init__(self, files: Optional[Dict[str, str]] = None, journal: Optional[InventoryJournal] = None,
+                 compact_every: int = COMPACT_EVERY):
+        self.files = files or {
+            "items": ITEMS_FILE,
+            "containers": CONTAINERS_FILE,
+            "cargo": CARGO_FILE,
+            "temp_cargo": TEMP_CARGO_FILE,
+        }
+        self.journal = journal or InventoryJournal()
+        self.compact_every = compact_every
+        self._tables: Dict[str, Optional[pl.DataFrame]] = {}
+        self._stamps: Dict[str, Tuple] = {}
+        self._dirty = set()
+        self._spatial: Optional[SpatialIndex] = None
+        self._search: Optional[ItemSearchSystem] = None
+        self._item_metadata: Optional[Dict[str, Dict]] = None
+        self._lock = threading.RLock()
+
+    def _read_table(self, name: str) -> None:
+        path = self.files[name]
+        stamp = snapshot_stamp(path)
+        table = None
+        try:
+            table = read_snapshot(path)
+        except Exception as e:
+            print(f"Error loading {path}: {str(e)}")
+        if table is not None and name in ("cargo", "temp_cargo"):
+            if "coordinates" in table.columns:
+                # Legacy string positions; the upgraded table is written back on the next compaction
+                print(f"Upgrading {path} to typed position columns")
+                table = upgrade_positions(table, "coordinates")
+                self._dirty.add(name)
+            if "container_id" in table.columns:
+                table = table.with_columns(pl.col("container_id").cast(pl.Utf8))
+        self._tables[name] = table
+        self._stamps[name] = stamp
+        self._table_replaced(name)
+
+    def _rows(self, name: str) -> List[Dict]:
+        table = self._tables.get(name)
+        return table.to_dicts() if table is not None else []
+
+    def _table_replaced(self, name: str) -> None:
+        """Bring the derived indexes up to date after a whole table was loaded or written."""
+        if name == "cargo":
+            self._spatial = None
+        if name == "items":
+            self._item_metadata = None
+        if self._search is not None:
+            if name == "items":
+                self._search.replace_items(self._rows("items"))
+            elif name == "containers":
+                self._search.replace_containers(self._rows("containers"))
+            elif name == "cargo":
+                self._search.replace_cargo(self._rows("cargo"))
+
+    def _load_tables(self, names: List[str]) -> None:
+        for name in names:
+            self._read_table(name)
+        records = self.journal.read()
+        for record in records:
+            self._apply(record, names)
+        if records:
+            self._dirty.update(name for name in names if name != "containers")
+
+    def load(self) -> None:
+        """(Re)load every snapshot from disk and replay the journal tail."""
+        with self._lock:
+            self._dirty.clear()
+            self._load_tables(list(self.files))
+
+    def refresh(self) -> None:
+        """Reload only the tables whose files changed outside the app."""
+        with self._lock:
+            changed = [
+                name for name, path in self.files.items()
+                if name not in self._stamps or snapshot_stamp(path) != self._stamps[name]
+            ]
+            if changed:
+                self._load_tables(changed)
+
+    def _get(self, name: str) -> Optional[pl.DataFrame]:
+        with self._lock:
+            self.refresh()
+            return self._tables.get(name)
+
+    def items(self) -> Optional[pl.DataFrame]:
+        return self._get("items")
+
+    def containers(self) -> Optional[pl.DataFrame]:
+        return self._get("containers")
+
+    def cargo(self) -> Optional[pl.DataFrame]:
+        return self._get("cargo")
+
+    def temp_cargo(self) -> Optional[pl.DataFrame]:
+        return self._get("temp_cargo")
+
+    def spatial_index(self) -> SpatialIndex:
+        """Per-container index of the cargo placements, (re)built from the cargo table when needed."""
+        with self._lock:
+            self.refresh()
+            if self._spatial is None:
+                self._spatial = SpatialIndex.from_cargo(self._tables.get("cargo"))
+            return self._spatial
+
+    def search_index(self) -> ItemSearchSystem:
+        """Long-lived search index over items, containers and cargo, built on first use."""
+        with self._lock:
+            self.refresh()
+            if self._search is None:
+                self._search = ItemSearchSystem(self._rows("items"), self._rows("containers"), self._rows("cargo"))
+            return self._search
+
+    def item_metadata(self) -> Dict[str, Dict]:
+        """Item rows by str(item_id) with parsed expiry dates, built on first use."""
+        with self._lock:
+            self.refresh()
+            if self._item_metadata is None:
+                self._item_metadata = item_metadata(self._rows("items"))
+            return self._item_metadata
+
+    def find_overlaps(self, container_id: str, position: Dict[str, float], exclude_item_id: Optional[int] = None,
+                      inclusive: bool = True) -> List[int]:
+        """Ids of the items in a container whose placement overlaps the given position columns."""
+        with self._lock:
+            return self.spatial_index().query(container_id, position_box(position), inclusive, exclude_item_id)
+
+    def arrangement_overlaps(self, inclusive: bool = False) -> Dict[str, List[Tuple[int, int]]]:
+        """Overlapping item pairs of the whole cargo arrangement, per container."""
+        with self._lock:
+            return self.spatial_index().overlapping_pairs(inclusive)
+
+    def has(self, *names: str) -> bool:
+        """True if every named table exists, on disk or as a not yet compacted table."""
+        with self._lock:
+            self.refresh()
+            return all(any(self._stamps.get(name) or ()) or self._tables.get(name) is not None for name in names)
+
+    def _apply(self, record: Dict, names: Iterable[str]) -> None:
+        """Apply one journal record to the in-memory tables listed in names."""
+        op = record["op"]
+        tables = self._tables
+        search = self._search
+        if op in ("retrieve", "usage"):
+            if "items" in names and tables.get("items") is not None:
+                tables["items"] = tables["items"].with_columns(
+                    pl.when(pl.col("item_id") == record["item_id"])
+                    .then(pl.lit(record["usage_limit"]))
+                    .otherwise(pl.col("usage_limit"))
+                    .alias("usage_limit")
+                )
+                if search is not None:
+                    search.set_usage_limit(record["item_id"], record["usage_limit"])
+                item = self._item_metadata.get(str(record["item_id"])) if self._item_metadata is not None else None
+                if item is not None:
+                    item["usage_limit"] = record["usage_limit"]
+            if op == "retrieve" and record["usage_limit"] == 0 and "cargo" in names and tables.get("cargo") is not None:
+                # Used-up items leave the main arrangement; the temp copy keeps them
+                tables["cargo"] = tables["cargo"].filter(pl.col("item_id") != record["item_id"])
+                if self._spatial is not None:
+                    self._spatial.remove(record["item_id"])
+                if search is not None:
+                    search.remove_placement(record["item_id"])
+        elif op == "remove_items":
+            if "items" in names and tables.get("items") is not None:
+                tables["items"] = tables["items"].filter(~pl.col("item_id").is_in(record["item_ids"]))
+                if search is not None:
+                    for item_id in record["item_ids"]:
+                        search.remove_item(item_id)
+                if self._item_metadata is not None:
+                    for item_id in record["item_ids"]:
+                        self._item_metadata.pop(str(item_id), None)
+        elif op == "place":
+            if "cargo" in names and tables.get("cargo") is not None:
+                tables["cargo"] = _upsert_row(tables["cargo"], record)
+                if self._spatial is not None:
+                    self._spatial.place(record["item_id"], record["container_id"], position_box(record))
+                if search is not None:
+                    search.place_item(record["item_id"], record["zone"], record["container_id"], row_position(record))
+            if "temp_cargo" in names:
+                if tables.get("temp_cargo") is not None:
+                    tables["temp_cargo"] = _upsert_row(tables["temp_cargo"], record)
+                else:
+                    # The temp copy starts out as a copy of the main arrangement
+                    tables["temp_cargo"] = tables.get("cargo")
+        elif op == "undock":
+            for name in ("cargo", "temp_cargo"):
+                if name in names and tables.get(name) is not None:
+                    tables[name] = tables[name].filter(
+                        ~((pl.col("container_id").cast(pl.Utf8) == record["container_id"]) &
+                          pl.col("item_id").is_in(record["item_ids"]))
+                    )
+            if "cargo" in names and tables.get("cargo") is not None:
+                for item_id in record["item_ids"]:
+                    if self._spatial is not None and self._spatial.locations.get(item_id) == record["container_id"]:
+                        self._spatial.remove(item_id)
+                    placement = search.cargo_data.get(str(item_id)) if search is not None else None
+                    if placement is not None and str(placement["container_id"]) == record["container_id"]:
+                        search.remove_placement(item_id)
+
+    def _record(self, record: Dict, touches: Tuple[str, ...]) -> None:
+        """Apply a mutation in memory and append it to the journal."""
+        with self._lock:
+            self.refresh()
+            self._apply(record, touches)
+            self.journal.append(record)
+            self._dirty.update(touches)
+            if len(self.journal) >= self.compact_every:
+                self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the snapshots touched since the last compaction and truncate the journal."""
+        with self._lock:
+            for name in sorted(self._dirty):
+                self._write(name, self._tables.get(name))
+            self._dirty.clear()
+            self.journal.truncate()
+
+    def _write(self, name: str, df: Optional[pl.DataFrame]) -> None:
+        path = self.files[name]
+        if df is None:
+            delete_snapshot(path)
+        else:
+            write_snapshot(df, path)
+        self._tables[name] = df
+        self._stamps[name] = snapshot_stamp(path)
+        self._table_replaced(name)
+
+    def _replace(self, name: str, df: Optional[pl.DataFrame]) -> None:
+        # Pending records were written against the old table, so fold them in first
+        self.compact()
+        self._write(name, df)
+
+    def replace_items(self, df: pl.DataFrame) -> None:
+        with self._lock:
+            self._replace("items", df)
+
+    def replace_containers(self, df: pl.DataFrame) -> None:
+        with self._lock:
+            self._replace("containers", df)
+
+    def replace_cargo(self, df: pl.DataFrame) -> None:
+        """Replace the cargo arrangement and reset the temp copy to match it."""
+        with self._lock:
+            self._replace("cargo", df)
+            self._write("temp_cargo", df)
+
+    def record_retrieval(self, item_id: int, usage_limit: int) -> None:
+        """One use of an item; at zero uses it is also removed from the main arrangement."""
+        self._record({"op": "retrieve", "item_id": int(item_id), "usage_limit": int(usage_limit)}, ("items", "cargo"))
+
+    def set_usage_limit(self, item_id: int, usage_limit: int) -> None:
+        self._record({"op": "usage", "item_id": int(item_id), "usage_limit": int(usage_limit)}, ("items",))
+
+    def remove_items(self, item_ids: Iterable[int]) -> None:
+        item_ids = [int(item_id) for item_id in item_ids]
+        if item_ids:
+            self._record({"op": "remove_items", "item_ids": item_ids}, ("items",))
+
+    def upsert_placement(self, item_id: int, zone: str, container_id: str, position: Dict[str, float]) -> None:
+        """Place or move an item in both the main and the temp cargo arrangement."""
+        self._record({
+            "op": "place",
+            "item_id": int(item_id),
+            "zone": zone,
+            "container_id": str(container_id),
+            **{column: float(position[column]) for column in POSITION_COLUMNS}
+        }, ("cargo", "temp_cargo"))
+
+    def undock(self, container_id: str, item_ids: Iterable[int]) -> None:
+        """Drop the placements of items that left the station with a container."""
+        item_ids = [int(item_id) for item_id in item_ids]
+        if item_ids:
+            self._record({"op": "undock", "container_id": str(container_id), "item_ids": item_ids}, ("cargo", "temp_cargo"))
+
+    def clear(self) -> None:
+        """Delete the imported tables and the cargo arrangement."""
+        with self._lock:
+            self.compact()
+            for name in ("items", "containers", "cargo"):
+                self._write(name, None)
+
+
+def _upsert_row(cargo_df: pl.DataFrame, record: Dict) -> pl.DataFrame:
+    item_id = record["item_id"]
+    values = {"zone": record["zone"], "container_id": record["container_id"],
+              **{column: record[column] for column in POSITION_COLUMNS}}
+    if cargo_df.filter(pl.col("item_id") == item_id).is_empty():
+        new_row = pl.DataFrame({"item_id": [item_id], **{column: [value] for column, value in values.items()}})
+        return pl.concat([cargo_df, new_row], how="diagonal_relaxed")
+
+    is_item = pl.col("item_id") == item_id
+    return cargo_df.with_columns([
+        pl.when(is_item).then(pl.lit(value)).otherwise(pl.col(column)).alias(column)
+        for column, value in values.items()
+    ])
+
+
+inventory_store = InventoryStore()
@@ -0,0 +1,52 @@
+import json
+import os
+from typing import Dict, List
+
+JOURNAL_FILE = "inventory_journal.jsonl"
+
+
+class InventoryJournal:
+    """
+    Append-only journal of inventory mutations, one JSON record per line.
+
+    Records describe the resulting state ("usage_limit is now 3", "item 7 is
+    now at ...") rather than deltas, so replaying a record that is already
+    reflected in the snapshot is harmless.
+    """
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+        self._pending = None
+
+    def read(self) -> List[Dict]:
+        """Return every record written since the last truncate."""
+        records = []
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                for line_number, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append; everything before it is intact
+                        print(f"Skipping unreadable journal record at line {line_number}")
+        self._pending = len(records)
+        return records
+
+    def append(self, record: Dict) -> None:
+        pending = len(self)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._pending = pending + 1
+
+    def truncate(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._pending = 0
+
+    def __len__(self) -> int:
+        if self._pending is None:
+            self.read()
+        return self._pending
@@ -0,0 +1,288 @@
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+import polars as pl
+
+# One CSV segment per UTC day, named YYYY-MM-DD.csv
+LOG_DIR = "logs"
+# Single-file log written by earlier versions; split into segments on first use
+LEGACY_LOG_FILE = "logs.csv"
+
+# Keys of the details dict that log_action callers pass; each is stored as its own column
+DETAIL_COLUMNS = ["from_container", "to_container", "reason", "search_type", "query"]
+
+LOG_SCHEMA = {
+    "log_id": pl.Int64,  # increases with every event, used as the pagination cursor
+    "timestamp": pl.Utf8,
+    "user_id": pl.Utf8,
+    "action_type": pl.Utf8,
+    "item_id": pl.Int64,
+    **{column: pl.Utf8 for column in DETAIL_COLUMNS},
+}
+
+# Segments written before log ids and detail columns existed
+JSON_DETAILS_SCHEMA = {
+    "timestamp": pl.Utf8,
+    "user_id": pl.Utf8,
+    "action_type": pl.Utf8,
+    "item_id": pl.Int64,
+    "details": pl.Utf8,  # JSON string
+}
+
+# Schema the segments are scanned with, so timestamps are typed by the CSV reader itself
+SCAN_SCHEMA = {**LOG_SCHEMA, "timestamp": pl.Datetime("us", "UTC")}
+
+# Shape of a log entry in API responses
+LOG_OUTPUT = [
+    pl.col("log_id"), pl.col("timestamp"), pl.col("user_id"), pl.col("action_type"), pl.col("item_id"),
+    pl.struct(DETAIL_COLUMNS).alias("details"),
+]
+
+# The writer thread appends whatever is queued every LOG_FLUSH_INTERVAL seconds,
+# or as soon as LOG_BATCH_SIZE events are waiting
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", "256"))
+
+
+def structure_details(df: pl.DataFrame) -> pl.DataFrame:
+    """Replace a JSON "details" column with the typed detail columns."""
+    details = pl.col("details").fill_null("{}").str.json_decode(pl.Struct({column: pl.Utf8 for column in DETAIL_COLUMNS}))
+    return df.with_columns(details.alias("details")).unnest("details")
+
+
+class LogSink:
+    """
+    Buffered writer (and reader) for the audit log.
+
+    Request handlers only put the event on a queue. A background thread
+    appends queued events to the segment of their UTC day in batches, so
+    logging never rewrites (or even reads) the existing history. Readers go
+    through scan(), which flushes first and only opens the segments of the
+    days in the requested range; stop() flushes on shutdown.
+
+    Every event gets a log_id one higher than the previous one, in the same
+    order as the events are queued and written.
+    """
+
+    def __init__(self, directory: str = LOG_DIR, flush_interval: float = LOG_FLUSH_INTERVAL,
+                 batch_size: int = LOG_BATCH_SIZE, legacy_file: Optional[str] = LEGACY_LOG_FILE):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.legacy_file = legacy_file
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._write_lock = threading.RLock()
+        self._id_lock = threading.Lock()
+        self._next_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def emit(self, user_id: str, action_type: str, item_id: Optional[int] = None, details: Optional[Dict] = None) -> None:
+        details = details or {}
+        unknown = set(details) - set(DETAIL_COLUMNS)
+        if unknown:
+            print(f"Log details not stored: {sorted(unknown)}")
+        row = {
+            "user_id": str(user_id) if user_id is not None else "",
+            "action_type": action_type,
+            "item_id": int(item_id) if item_id is not None else None,
+            **{column: str(details[column]) if details.get(column) is not None else None for column in DETAIL_COLUMNS},
+        }
+        if self._next_id is None:
+            self._prepare()
+        with self._id_lock:
+            # Id, timestamp and queue position are taken together so all three agree on the order
+            row["log_id"] = self._next_id
+            row["timestamp"] = datetime.now(timezone.utc).isoformat()
+            self._next_id += 1
+            self._queue.put(row)
+        self.start()
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def start(self) -> None:
+        """Start the writer thread (idempotent; emit starts it on first use)."""
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer thread and append everything still queued."""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing logs to {self.directory}: {str(e)}")
+
+    def _drain(self) -> List[Dict]:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def segment_path(self, day: str) -> str:
+        return os.path.join(self.directory, f"{day}.csv")
+
+    def segment_days(self) -> List[str]:
+        """Days (YYYY-MM-DD) that have a segment, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.directory) if name.endswith(".csv"))
+
+    def _append(self, df: pl.DataFrame) -> None:
+        """Append rows (timestamps as ISO strings) to the segments of their days."""
+        os.makedirs(self.directory, exist_ok=True)
+        for (day,), day_df in df.group_by(pl.col("timestamp").str.slice(0, 10), maintain_order=True):
+            path = self.segment_path(day)
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, "a", newline="") as f:
+                day_df.select(list(LOG_SCHEMA)).write_csv(f, include_header=new_file)
+
+    def _number(self, df: pl.DataFrame, next_id: int) -> pl.DataFrame:
+        return df.with_row_index("log_id", offset=next_id).with_columns(pl.col("log_id").cast(pl.Int64))
+
+    @staticmethod
+    def _last_id(path: str) -> int:
+        return pl.scan_csv(path, schema=LOG_SCHEMA).select(pl.col("log_id").max()).collect().item() or 0
+
+    def _prepare(self) -> None:
+        """
+        Bring older logs up to the current format and find the next log id:
+        segments with a JSON details column are rewritten with log ids and
+        detail columns, then a single-file logs.csv is split into segments.
+
+        Log ids increase from day to day, so only the newest current-format
+        segment (before each upgraded one, and the last) is read for its
+        highest id.
+        """
+        with self._write_lock:
+            if self._next_id is not None:
+                return
+            next_id = 1
+            header = ",".join(LOG_SCHEMA)
+            newest_current = None
+            for day in self.segment_days():
+                path = self.segment_path(day)
+                with open(path, "r") as f:
+                    current = f.readline().strip() == header
+                if current:
+                    newest_current = path
+                    continue
+                if newest_current is not None:
+                    next_id = max(next_id, self._last_id(newest_current) + 1)
+                    newest_current = None
+                old_df = structure_details(pl.read_csv(path, schema_overrides=JSON_DETAILS_SCHEMA))
+                self._number(old_df, next_id).select(list(LOG_SCHEMA)).write_csv(path)
+                next_id += len(old_df)
+                print(f"Upgraded log segment {path} to detail columns")
+            if newest_current is not None:
+                next_id = max(next_id, self._last_id(newest_current) + 1)
+
+            if self.legacy_file and os.path.exists(self.legacy_file):
+                try:
+                    legacy_df = pl.read_csv(self.legacy_file, schema_overrides=JSON_DETAILS_SCHEMA)
+                    # Normalize to UTC so every row lands in the segment of its UTC day
+                    legacy_df = structure_details(legacy_df.with_columns(
+                        pl.col("timestamp").str.to_datetime(time_zone="UTC", strict=False)
+                        .dt.strftime("%Y-%m-%dT%H:%M:%S%.6f+00:00")
+                    ).drop_nulls("timestamp"))
+                    if not legacy_df.is_empty():
+                        self._append(self._number(legacy_df, next_id))
+                        next_id += len(legacy_df)
+                    os.remove(self.legacy_file)
+                    print(f"Moved {len(legacy_df)} log entries from {self.legacy_file} to {self.directory}/")
+                except Exception as e:
+                    print(f"Error migrating {self.legacy_file}: {str(e)}")
+            self._next_id = next_id
+
+    def flush(self) -> int:
+        """Append every queued event to its day segment; returns how many were written."""
+        with self._write_lock:
+            if self._next_id is None:
+                self._prepare()
+            rows = self._drain()
+            if rows:
+                self._append(pl.DataFrame(rows, schema=LOG_SCHEMA))
+            return len(rows)
+
+    def _segment_paths(self, start: datetime, end: datetime) -> List[str]:
+        first_day, last_day = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        return [self.segment_path(day) for day in self.segment_days() if first_day <= day <= last_day]
+
+    def _scan(self, paths: List[str], start: datetime, end: datetime, item_id: Optional[int], user_id: Optional[str],
+              action_type: Optional[str], after_log_id: Optional[int]) -> pl.LazyFrame:
+        conditions = (pl.col("timestamp") >= start) & (pl.col("timestamp") <= end)
+        if item_id is not None:
+            conditions = conditions & (pl.col("item_id") == item_id)
+        if user_id is not None:
+            conditions = conditions & (pl.col("user_id") == user_id)
+        if action_type is not None:
+            conditions = conditions & (pl.col("action_type") == action_type)
+        if after_log_id is not None:
+            conditions = conditions & (pl.col("log_id") > after_log_id)
+        return pl.scan_csv(paths, schema=SCAN_SCHEMA).filter(conditions)
+
+    def scan(self, start: datetime, end: datetime, item_id: Optional[int] = None, user_id: Optional[str] = None,
+             action_type: Optional[str] = None, after_log_id: Optional[int] = None) -> Optional[pl.LazyFrame]:
+        """
+        Lazy scan of the events between start and end (inclusive, UTC) in
+        log_id order, with the optional filters pushed down into the CSV
+        reader. Only the segments of the days in range are opened; None if
+        there are none.
+        """
+        self.flush()
+        paths = self._segment_paths(start, end)
+        if not paths:
+            return None
+        return self._scan(paths, start, end, item_id, user_id, action_type, after_log_id)
+
+    def iter_segments(self, start: datetime, end: datetime, item_id: Optional[int] = None, user_id: Optional[str] = None,
+                      action_type: Optional[str] = None, after_log_id: Optional[int] = None,
+                      limit: Optional[int] = None) -> Iterator[pl.DataFrame]:
+        """Like scan(), but collected one daily segment at a time, stopping after limit rows."""
+        self.flush()
+        remaining = limit
+        for path in self._segment_paths(start, end):
+            segment = self._scan([path], start, end, item_id, user_id, action_type, after_log_id)
+            if remaining is not None:
+                segment = segment.head(remaining)
+            df = segment.collect()
+            if df.is_empty():
+                continue
+            yield df
+            if remaining is not None:
+                remaining -= len(df)
+                if remaining <= 0:
+                    return
+
+    def clear(self) -> None:
+        """Drop queued events and delete every segment."""
+        with self._write_lock:
+            self._drain()
+            for day in self.segment_days():
+                os.remove(self.segment_path(day))
+            if self.legacy_file and os.path.exists(self.legacy_file):
+                os.remove(self.legacy_file)
+
+
+log_sink = LogSink()
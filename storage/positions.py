@@ -0,0 +1,70 @@
+from typing import Dict, Optional
+import polars as pl
+
+# Typed position columns of the cargo arrangement (and waste) tables.
+# x/y/z follow the API's width/depth/height axes.
+POSITION_COLUMNS = ["start_x_cm", "start_y_cm", "start_z_cm", "end_x_cm", "end_y_cm", "end_z_cm"]
+
+CARGO_SCHEMA = {
+    "item_id": pl.Int64,
+    "zone": pl.Utf8,
+    "container_id": pl.Utf8,
+    **{column: pl.Float64 for column in POSITION_COLUMNS},
+}
+
+_NUMBER_PATTERN = r"[-+]?\d*\.\d+|[-+]?\d+"
+
+
+def upgrade_positions(df: pl.DataFrame, source_column: str) -> pl.DataFrame:
+    """
+    Convert a legacy "(x,y,z),(x,y,z)" string column into the typed position
+    columns. Runs once per table load, fully inside polars.
+    """
+    if source_column not in df.columns or all(column in df.columns for column in POSITION_COLUMNS):
+        return df
+    numbers = pl.col(source_column).cast(pl.Utf8).str.extract_all(_NUMBER_PATTERN)
+    return df.with_columns([
+        numbers.list.get(i, null_on_oob=True).cast(pl.Float64).alias(column)
+        for i, column in enumerate(POSITION_COLUMNS)
+    ]).drop(source_column)
+
+
+def position_values(position) -> Dict[str, float]:
+    """Position columns for an API Position model (or its dict form)."""
+    if not isinstance(position, dict):
+        position = position.model_dump()
+    start, end = position["startCoordinates"], position["endCoordinates"]
+    return {
+        "start_x_cm": float(start["width_cm"]),
+        "start_y_cm": float(start["depth_cm"]),
+        "start_z_cm": float(start["height_cm"]),
+        "end_x_cm": float(end["width_cm"]),
+        "end_y_cm": float(end["depth_cm"]),
+        "end_z_cm": float(end["height_cm"]),
+    }
+
+
+def row_position(row: Dict) -> Optional[Dict]:
+    """API-shaped position (startCoordinates/endCoordinates) from a row with position columns."""
+    if any(row.get(column) is None for column in POSITION_COLUMNS):
+        return None
+    return {
+        "startCoordinates": {
+            "width_cm": float(row["start_x_cm"]),
+            "depth_cm": float(row["start_y_cm"]),
+            "height_cm": float(row["start_z_cm"])
+        },
+        "endCoordinates": {
+            "width_cm": float(row["end_x_cm"]),
+            "depth_cm": float(row["end_y_cm"]),
+            "height_cm": float(row["end_z_cm"])
+        }
+    }
+
+
+def coordinates_expr() -> pl.Expr:
+    """The legacy "(x,y,z),(x,y,z)" string, built from the position columns for CSV export."""
+    return pl.format(
+        "({},{},{}),({},{},{})",
+        *[pl.col(column).round(2) for column in POSITION_COLUMNS]
+    ).alias("coordinates")
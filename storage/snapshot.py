@@ -0,0 +1,60 @@
+import os
+from typing import Optional, Tuple
+import polars as pl
+
+# "csv" keeps the plain CSV snapshots; "ipc" writes Arrow IPC snapshots next to
+# them, which load through a memory map instead of being parsed.
+SNAPSHOT_FORMAT = os.environ.get("INVENTORY_SNAPSHOT_FORMAT", "csv").lower()
+
+
+def ipc_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".arrow"
+
+
+def file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def snapshot_stamp(csv_path: str) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+    """Stamps of the CSV and the IPC snapshot of a table; changes whenever either file does."""
+    return (file_stamp(csv_path), file_stamp(ipc_path(csv_path)))
+
+
+def snapshot_exists(csv_path: str) -> bool:
+    return any(snapshot_stamp(csv_path))
+
+
+def read_snapshot(csv_path: str) -> Optional[pl.DataFrame]:
+    """
+    Load a table from whichever snapshot is newer. An IPC snapshot is memory
+    mapped (polars maps uncompressed IPC files itself); a CSV that is newer
+    than it (e.g. edited by hand) still wins.
+    """
+    csv_stamp, ipc_stamp = snapshot_stamp(csv_path)
+    if ipc_stamp is not None and (csv_stamp is None or ipc_stamp[0] >= csv_stamp[0]):
+        return pl.read_ipc(ipc_path(csv_path))
+    if csv_stamp is not None and csv_stamp[1] > 0:
+        return pl.read_csv(csv_path)
+    return None
+
+
+def write_snapshot(df: pl.DataFrame, csv_path: str, snapshot_format: str = SNAPSHOT_FORMAT) -> None:
+    if snapshot_format == "ipc":
+        # Write to a temp file and swap it in, so readers still mapping the old file are unaffected
+        path = ipc_path(csv_path)
+        df.write_ipc(path + ".tmp", compression="uncompressed")
+        os.replace(path + ".tmp", path)
+    else:
+        df.write_csv(csv_path)
+        if os.path.exists(ipc_path(csv_path)):
+            os.remove(ipc_path(csv_path))
+
+
+def delete_snapshot(csv_path: str) -> None:
+    for path in (csv_path, ipc_path(csv_path)):
+        if os.path.exists(path):
+            os.remove(path)
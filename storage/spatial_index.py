@@ -0,0 +1,134 @@
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import polars as pl
+from storage.positions import POSITION_COLUMNS
+
+# (start_x, start_y, start_z, end_x, end_y, end_z), same order as POSITION_COLUMNS
+Box = Tuple[float, float, float, float, float, float]
+
+# Edge length of a grid cell; boxes only meet the items registered in the cells they cover
+GRID_CELL_CM = float(os.environ.get("SPATIAL_GRID_CELL_CM", "25"))
+
+
+def boxes_overlap(a: Box, b: Box, inclusive: bool = True) -> bool:
+    """
+    Axis-aligned box test. Inclusive treats boxes that only touch as
+    overlapping (the /place rule); strict requires a shared volume.
+    """
+    if inclusive:
+        return all(a[i] <= b[i + 3] and a[i + 3] >= b[i] for i in range(3))
+    return all(a[i] < b[i + 3] and a[i + 3] > b[i] for i in range(3))
+
+
+def normalized_box(box: Box) -> Box:
+    """Box with start <= end on every axis, whatever order the corners were given in."""
+    return (*(min(box[i], box[i + 3]) for i in range(3)), *(max(box[i], box[i + 3]) for i in range(3)))
+
+
+class BoxGrid:
+    """Uniform grid over one container, mapping each cell to the items whose box covers it."""
+
+    def __init__(self, cell_cm: float = GRID_CELL_CM):
+        self.cell_cm = cell_cm
+        self.boxes: Dict[int, Box] = {}
+        self.cells: Dict[Tuple[int, int, int], Set[int]] = {}
+
+    def _cells(self, box: Box) -> Iterable[Tuple[int, int, int]]:
+        lo = [math.floor(box[i] / self.cell_cm) for i in range(3)]
+        hi = [math.floor(box[i + 3] / self.cell_cm) for i in range(3)]
+        for x in range(lo[0], hi[0] + 1):
+            for y in range(lo[1], hi[1] + 1):
+                for z in range(lo[2], hi[2] + 1):
+                    yield (x, y, z)
+
+    def insert(self, item_id: int, box: Box) -> None:
+        self.remove(item_id)
+        box = normalized_box(box)
+        self.boxes[item_id] = box
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, set()).add(item_id)
+
+    def remove(self, item_id: int) -> None:
+        box = self.boxes.pop(item_id, None)
+        if box is None:
+            return
+        for cell in self._cells(box):
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self.cells[cell]
+
+    def query(self, box: Box, inclusive: bool = True, exclude: Optional[int] = None) -> List[int]:
+        """Ids of the items whose box overlaps the given one."""
+        box = normalized_box(box)
+        candidates = set()
+        for cell in self._cells(box):
+            candidates.update(self.cells.get(cell, ()))
+        candidates.discard(exclude)
+        return sorted(item_id for item_id in candidates if boxes_overlap(box, self.boxes[item_id], inclusive))
+
+    def overlapping_pairs(self, inclusive: bool = False) -> List[Tuple[int, int]]:
+        """Every pair of overlapping items, each pair once with the smaller id first."""
+        pairs = []
+        for item_id, box in self.boxes.items():
+            pairs.extend((item_id, other) for other in self.query(box, inclusive) if other > item_id)
+        return sorted(pairs)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+
+class SpatialIndex:
+    """Per-container BoxGrids mirroring the placements of a cargo arrangement table."""
+
+    def __init__(self, cell_cm: float = GRID_CELL_CM):
+        self.cell_cm = cell_cm
+        self.containers: Dict[str, BoxGrid] = {}
+        self.locations: Dict[int, str] = {}
+
+    @classmethod
+    def from_cargo(cls, cargo_df: Optional[pl.DataFrame], cell_cm: float = GRID_CELL_CM) -> "SpatialIndex":
+        index = cls(cell_cm)
+        if cargo_df is None or cargo_df.is_empty():
+            return index
+        rows = cargo_df.drop_nulls(["item_id", "container_id", *POSITION_COLUMNS]).select(
+            "item_id", "container_id", *POSITION_COLUMNS
+        )
+        for item_id, container_id, *box in rows.iter_rows():
+            index.place(item_id, container_id, tuple(box))
+        return index
+
+    def place(self, item_id: int, container_id: str, box: Box) -> None:
+        item_id, container_id = int(item_id), str(container_id)
+        if self.locations.get(item_id, container_id) != container_id:
+            self.remove(item_id)
+        self.containers.setdefault(container_id, BoxGrid(self.cell_cm)).insert(item_id, box)
+        self.locations[item_id] = container_id
+
+    def remove(self, item_id: int) -> None:
+        container_id = self.locations.pop(int(item_id), None)
+        if container_id is not None:
+            self.containers[container_id].remove(int(item_id))
+
+    def query(self, container_id: str, box: Box, inclusive: bool = True, exclude: Optional[int] = None) -> List[int]:
+        grid = self.containers.get(str(container_id))
+        return grid.query(box, inclusive, exclude) if grid is not None else []
+
+    def overlapping_pairs(self, inclusive: bool = False) -> Dict[str, List[Tuple[int, int]]]:
+        """Overlapping item pairs per container (only containers that have any)."""
+        overlaps = {}
+        for container_id, grid in sorted(self.containers.items()):
+            pairs = grid.overlapping_pairs(inclusive)
+            if pairs:
+                overlaps[container_id] = pairs
+        return overlaps
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+
+def position_box(position: Dict[str, float]) -> Box:
+    """Box of a position-column dict (see storage.positions.position_values)."""
+    return tuple(float(position[column]) for column in POSITION_COLUMNS)
@@ -0,0 +1,113 @@
+"""
+Tests for algos.placement_algo.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algos.placement_algo import AdvancedCargoPlacement, ExtremePoints, ItemDimensions, PlacementStates
+
+
+def cube_item(item_id, width, depth, height, priority=50):
+    return {"item_id": item_id, "width_cm": width, "depth_cm": depth, "height_cm": height, "priority": priority}
+
+
+class ExtremePointsTest(unittest.TestCase):
+    def test_full_container_has_no_candidates(self):
+        points = ExtremePoints(20, 20, 20)
+        self.assertEqual(points.find((20, 20, 20)), (0, 0, 0))
+        points.add((0, 0, 0), (20, 20, 20))
+        self.assertEqual(len(points.points), 0)
+        self.assertIsNone(points.find((20, 20, 20)))
+        self.assertIsNone(points.find((1, 1, 1)))
+
+    def test_exact_fit_on_top(self):
+        points = ExtremePoints(20, 20, 20)
+        points.add((0, 0, 0), (20, 20, 10))
+        self.assertEqual(points.find((20, 20, 10)), (0, 0, 10))
+        self.assertIsNone(points.find((20, 20, 11)))
+
+
+class ExtremePointPlacementTest(unittest.TestCase):
+    def setUp(self):
+        AdvancedCargoPlacement._container_states.clear()
+
+    def placer(self, container_id):
+        return AdvancedCargoPlacement(
+            {"container_id": container_id, "width_cm": 20, "depth_cm": 20, "height_cm": 20},
+            mode="extreme_points"
+        )
+
+    def test_full_container(self):
+        placer = self.placer("full")
+        placements, _ = placer.find_optimal_placement([cube_item(1, 20, 20, 20), cube_item(2, 20, 20, 20)])
+        first = next(placement for placement in placements if placement["item_id"] == "1")
+        self.assertEqual(first["position"]["startCoordinates"], {"width_cm": 0.0, "depth_cm": 0.0, "height_cm": 0.0})
+        # No room is left for the second item without rearranging
+        self.assertIsNone(placer._find_free_position(ItemDimensions(20, 20, 20, 50, "2")))
+
+    def test_exact_fit_second_item(self):
+        placer = self.placer("exact-fit")
+        placements, _ = placer.find_optimal_placement([cube_item(1, 20, 20, 10, 60), cube_item(2, 20, 20, 10, 40)])
+        starts = {placement["item_id"]: placement["position"]["startCoordinates"] for placement in placements}
+        self.assertEqual(starts["1"], {"width_cm": 0.0, "depth_cm": 0.0, "height_cm": 0.0})
+        self.assertEqual(starts["2"], {"width_cm": 0.0, "depth_cm": 0.0, "height_cm": 10.0})
+
+
+class PlacementStateTest(unittest.TestCase):
+    DIMS = {"width_cm": 40, "depth_cm": 40, "height_cm": 40}
+    ITEMS = [cube_item(1, 20, 20, 20, 60), cube_item(2, 40, 20, 10, 40)]
+
+    def placer(self, container_id, cargo_rows=None):
+        return AdvancedCargoPlacement(dict(self.DIMS, container_id=container_id), cargo_rows=cargo_rows)
+
+    def test_repeated_request_gives_same_result(self):
+        first, _ = self.placer("C1", []).find_optimal_placement(self.ITEMS)
+        second, _ = self.placer("C1", []).find_optimal_placement(self.ITEMS)
+        self.assertEqual(first, second)
+        self.assertEqual(self.placer("C1", []).current_placements, {})
+
+    def test_same_placer_run_twice(self):
+        placer = self.placer("C2", [])
+        self.assertEqual(placer.find_optimal_placement(self.ITEMS), placer.find_optimal_placement(self.ITEMS))
+
+    def test_twin_containers_are_independent(self):
+        twin_a, _ = self.placer("twin-a").find_optimal_placement(self.ITEMS)
+        twin_b, _ = self.placer("twin-b").find_optimal_placement(self.ITEMS)
+        self.assertEqual(twin_a, twin_b)
+
+    def test_starts_from_cargo_arrangement(self):
+        rows = [{"item_id": 7, "start_x_cm": 0, "start_y_cm": 0, "start_z_cm": 0,
+                 "end_x_cm": 20.5, "end_y_cm": 40, "end_z_cm": 40}]
+        placements, _ = self.placer("C3", rows).find_optimal_placement([cube_item(1, 10, 10, 10)])
+        self.assertEqual(placements[0]["position"]["startCoordinates"]["width_cm"], 21.0)
+        # A changed arrangement reloads the state
+        placements, _ = self.placer("C3", []).find_optimal_placement([cube_item(1, 10, 10, 10)])
+        self.assertEqual(placements[0]["position"]["startCoordinates"]["width_cm"], 0.0)
+
+    def test_replace_arranged_item(self):
+        rows = [{"item_id": 1, "start_x_cm": 0, "start_y_cm": 0, "start_z_cm": 0,
+                 "end_x_cm": 10, "end_y_cm": 10, "end_z_cm": 10}]
+        for mode in ("extreme_points", "heightmap", "grid"):
+            placer = AdvancedCargoPlacement(
+                {"container_id": f"C4-{mode}", "width_cm": 20, "depth_cm": 10, "height_cm": 10},
+                mode=mode, cargo_rows=rows
+            )
+            placements, _ = placer.find_optimal_placement([cube_item(1, 10, 10, 10)])
+            self.assertEqual(placements[0]["position"]["startCoordinates"]["width_cm"], 0.0, mode)
+            # The cached state still holds the arranged box for other items
+            other, _ = placer.find_optimal_placement([cube_item(2, 10, 10, 10)])
+            self.assertEqual(other[0]["position"]["startCoordinates"]["width_cm"], 10.0, mode)
+
+    def test_state_count_is_bounded(self):
+        states = PlacementStates(capacity=3)
+        for index in range(10):
+            states.get(f"C{index}", (10, 10, 10))
+        self.assertEqual(len(states), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()